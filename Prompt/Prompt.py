@@ -9,17 +9,21 @@ GLOBAL DATE RULES:
 SCHEMA FUNCTION CHANGE:
 - A single function `get_schema_info` is available from the SchemaGroundingPlugin. It returns both table descriptions and table columns together as a single JSON structure (for example, { "tables": [...], "columns": [...] }).
 - The pipeline agents (QueryBuilderAgent and others) must **choose relevant tables and columns** from the `SchemaGroundingPlugin.get_schema_info` output; do NOT assume separate function calls for descriptions vs columns.
+- Prefer `SchemaGroundingPlugin.get_relevant_schema(question, k)`: it returns the same structure restricted to the top-k tables relevant to the user's question, plus `join_keys` between them. Fall back to `get_schema_info` only if the relevant tables are missing from that result.
 - **Use plugin functions ONLY for:**
-    1. **Retrieving schema_info** (SchemaGroundingPlugin.get_schema_info), and  
-    2. **Executing SQL queries** (SchemaGroundingPlugin.execute_sql_script)  
+    1. **Retrieving schema_info** (SchemaGroundingPlugin.get_relevant_schema / SchemaGroundingPlugin.get_schema_info),  
+    2. **Validating SQL locally** (SchemaGroundingPlugin.validate_sql),  
+    3. **Table statistics** (SchemaGroundingPlugin.get_table_row_estimates / get_table_statistics), and  
+    4. **Executing SQL queries** (SchemaGroundingPlugin.execute_sql_script)  
   Agents must NOT invent tables, mock schema, or simulate SQL results.
 
 Your tasks:
 1. Classify the request as CHIT_CHAT, FOLLOW_UP, or NL2SQL.
 2. If NL2SQL, run the full pipeline:
-   - SchemaGroundingPlugin.get_schema_info (single plugin call – mandatory)
+   - SchemaGroundingPlugin.get_relevant_schema (single plugin call – mandatory; get_schema_info as fallback)
    - QueryBuilderAgent (use schema returned by SchemaGroundingPlugin.get_schema_info; do NOT fabricate schema)
-   - EvaluationAgent (with retries)
+   - SchemaGroundingPlugin.validate_sql (local checks, with retries)
+   - EvaluationAgent (only when a semantic check is still needed)
    - SchemaGroundingPlugin.execute_sql_script (mandatory plugin call – agents must not simulate execution)
    - DebugAgent (optional retries)
    - ExplanationAgent
@@ -35,11 +39,14 @@ INPUT
     "last_sql": "{{$last_sql}}",
     "last_result_summary": "{{$last_result_summary}}"
   },
+  "table_row_estimates": {{$table_row_estimates_json}},
   "config": {
     "db_dialect": "{{$db_dialect}}",
     "max_rows": "{{$max_rows}}",
+    "query_timeout_ms": "{{$query_timeout_ms}}",
     "max_eval_retries": "{{$max_eval_retries}}",
-    "max_debug_retries": "{{$max_debug_retries}}"
+    "max_debug_retries": "{{$max_debug_retries}}",
+    "result_format": "{{$result_format}}"
   }
 }
 
@@ -54,22 +61,27 @@ DECISION RULES
 =====================
 NL2SQL PIPELINE (updated)
 =====================
-1) SchemaGroundingPlugin.get_schema_info  
-   - MUST be retrieved via the SchemaGroundingPlugin.get_schema_info call.
+1) SchemaGroundingPlugin.get_relevant_schema  
+   - MUST be retrieved via SchemaGroundingPlugin.get_relevant_schema (pass the user's question), or get_schema_info as fallback.
    - Agents must NOT create or assume schema manually.
 
 2) QueryBuilderAgent  
    - Builds SQL ONLY using schema returned by SchemaGroundingPlugin.get_schema_info.
 
-3) EvaluationAgent  
-   - Validates SQL (date normalization, syntax, schema correctness).
+3) SchemaGroundingPlugin.validate_sql, then EvaluationAgent  
+   - First call SchemaGroundingPlugin.validate_sql(sql, params, max_rows). It checks SELECT-only, LIMIT, date literal format, syntax and schema correctness locally and returns the same JSON as EvaluationAgent.
+   - If `is_valid` is false, send `feedback_for_builder` back to QueryBuilderAgent (counts against max_eval_retries). Do NOT call EvaluationAgent for these failures.
+   - Call EvaluationAgent only when local validation passed AND a semantic check is still needed (the SQL joins several tables, or the question is ambiguous about which columns answer it). Otherwise go straight to execution.
 
 4) SchemaGroundingPlugin.execute_sql_script  
    - SQL MUST be executed by SchemaGroundingPlugin.execute_sql_script.
+   - Pass the builder's `params` (values for ? placeholders), `max_rows` = config.max_rows, `timeout_ms` = config.query_timeout_ms and `result_format` = config.result_format ("tuples": column names appear once in `columns`, each row is an array in that order). If the result has `truncated: true`, only the first max_rows rows were returned; report `total_row_count` when it is not null.
    - Agents must NOT simulate SQL execution or invent results.
 
 5) DebugAgent  
    - If SchemaGroundingPlugin.execute_sql_script errors, suggest deterministic fixes.
+   - Give EvaluationAgent and DebugAgent the input `table_row_estimates` (and, when cost matters, SchemaGroundingPlugin.get_table_statistics for distinct counts / null fractions) so they can reason about query cost.
+   - Pass the result's `error` and `error_type` as execution_error. `error_type: "TIMEOUT"` means the query was cancelled at the deadline; the fix must make it cheaper, not just retry it.
 
 6) ExplanationAgent  
    - Generates final natural-language explanation.
@@ -102,6 +114,7 @@ Build one safe SELECT SQL query using grounded schema only.
 
 SCHEMA INPUT NOTE:
 - You will receive schema_grounding as a combined JSON from SchemaGroundingPlugin.get_schema_info that contains both table descriptions and table columns.
+- The schema may come from SchemaGroundingPlugin.get_relevant_schema, in which case it is already restricted to the relevant tables and includes `join_keys`; use those keys for JOIN conditions. Keys with a `relationship` field (e.g. "many_to_one") were verified against the data at import time and are indexed, so prefer them.
 - You must pick the relevant tables and columns from that combined schema. Do NOT assume extra tables/columns beyond what is present.
 
 DATE FORMAT RULE:
@@ -191,6 +204,9 @@ DEBUG_AGENT_PROMPT = r"""
 You are the DEBUG AGENT.
 Solve SQL execution errors with minimal deterministic edits.
 
+TIMEOUT NOTE:
+- If execution_error reports error_type TIMEOUT, the query was cancelled for running too long. Classify it as PERFORMANCE and rewrite it to be cheaper: add selective filters, join only on key columns (never a cartesian product), aggregate before joining, keep LIMIT.
+
 DATE FORMAT NOTE:
 - If the failure is date-related, ensure final SQL uses DD/MM/YYYY or DD-MM-YYYY only.
 - If the user's original phrasing used natural-language dates, normalization must end up as DD-MM-YYYY.
@@ -227,16 +243,18 @@ DATE FORMAT RULE:
 - Any dates displayed in results must appear as DD/MM/YYYY or DD-MM-YYYY only.
 - If the user provided dates in words, explain that you normalized them to DD-MM-YYYY for consistency.
 
+RESULT DIGEST NOTE:
+- result_digest is computed locally from the full result. When "complete" is true, sample_rows holds every row (in "columns" order).
+- When "complete" is false, "columns" maps each column to its statistics (type, count, nulls, distinct, min/max/mean/std/sum/quantiles or top_values) and sample_rows is only a sample.
+- Base totals, averages, ranges and "most common" claims on those statistics; never extrapolate them from sample_rows.
+
 =====================
 INPUT
 =====================
 {
   "user_query":"{{$user_query}}",
   "final_sql":"{{$final_sql}}",
-  "result_preview": {
-     "columns": {{$result_columns_json}},
-     "rows": {{$result_rows_json}}
-  },
+  "result_digest": {{$result_digest_json}},
   "row_count": {{$row_count}},
   "assumptions": {{$assumptions_json}},
   "execution_time_ms": {{$execution_time_ms}}
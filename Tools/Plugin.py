@@ -1,64 +1,249 @@
 # schema_grounding_plugin.py
 # SchemaGroundingPlugin for Semantic Kernel (updated get_table_columns to match your Table_columns schema)
 # and added a VERY SIMPLE execute_sql_script kernel function that directly executes the given SQL.
+# All queries go through a pooled set of read-only connections (see Tools/db_pool.py).
 #
 # Replace DB_PATH placeholder below with the path to your .sqlite file before using.
 
 import sqlite3
 import asyncio
-from typing import List, Dict, Any, Optional
+import hashlib
+import json
+import time
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from semantic_kernel.functions import kernel_function
 
+from Tools.db_pool import QueryDeadline, SQLiteConnectionPool
+from Tools.schema_index import SchemaIndex, find_join_keys
+from Tools.result_format import encode_rows
+from Tools.result_cache import ResultCache, RESULT_CACHE_MAX_BYTES
+from Tools.sql_validator import validate_sql as _validate_sql
+from Tools.table_stats import TableStatistics, run_analyze
+from Tools.index_advisor import IndexAdvisor
+from Tools import metrics
+
 # ----- CONFIG: replace this with your actual sqlite path -----
 DB_PATH = "./db.sqlite"  # <-- replace me with the actual .sqlite file path
 # -------------------------------------------------------------
 
+# default number of tables returned by get_relevant_schema
+RELEVANT_SCHEMA_TOP_K = 3
+
+# ----- CONFIG: execute_sql_script result budget -----
+DEFAULT_MAX_ROWS = 1000             # matches ChatRequest.max_rows default
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 # approximate size of returned row values
+FETCH_BATCH_SIZE = 256              # rows pulled per cursor.fetchmany call
+COUNT_SCAN_LIMIT = 10000            # extra rows stepped past the cap to report a total
+DEFAULT_TIMEOUT_MS = 10000          # per-query deadline (matches ChatRequest.query_timeout_ms)
+VALIDATION_POOL_SIZE = 2            # connections for validate_sql's EXPLAIN (kept apart from execution)
+INDEX_ADVISOR_ENABLED = True        # queue executed queries for the index advisor (plans are taken lazily)
+INDEX_ADVISOR_AUTO_CREATE = False   # create proposed indexes automatically (needs a writable db file)
+# ----------------------------------------------------
+
 
-async def _query_sqlite(db_path: str, query: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+async def _query_sqlite(pool: SQLiteConnectionPool, query: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
     """
     Helper: run blocking sqlite queries in a thread to avoid blocking the event loop.
-    Returns list of dicts (rows).
+    Uses a pooled read-only connection. Returns list of dicts (rows).
     """
     params = params or []
 
     def run():
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        try:
+        with pool.connection() as conn:
             cur = conn.cursor()
-            cur.execute(query, params)
-            rows = cur.fetchall()
-            return [dict(r) for r in rows]
-        finally:
-            conn.close()
+            try:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+                return [dict(r) for r in rows]
+            finally:
+                cur.close()
 
     return await asyncio.to_thread(run)
 
 
+def _approx_row_bytes(row: sqlite3.Row) -> int:
+    size = 0
+    for v in row:
+        if isinstance(v, (str, bytes)):
+            size += len(v)
+        else:
+            size += 8
+    return size
+
+
+def _fetch_capped(cur: sqlite3.Cursor, max_rows: int, max_bytes: int) -> Dict[str, Any]:
+    """
+    Helper: pull rows from an executed cursor in fetchmany batches until the row or
+    byte budget is hit. Returns rows plus truncation info; total_row_count is only
+    filled in when the cursor is exhausted within COUNT_SCAN_LIMIT extra rows.
+    """
+    rows: List[sqlite3.Row] = []
+    used_bytes = 0
+    truncated = False
+    while not truncated:
+        batch = cur.fetchmany(FETCH_BATCH_SIZE)
+        if not batch:
+            break
+        for i, r in enumerate(batch):
+            if len(rows) >= max_rows:
+                truncated = True
+            else:
+                used_bytes += _approx_row_bytes(r)
+                if used_bytes > max_bytes and rows:
+                    truncated = True
+            if truncated:
+                overflow = len(batch) - i
+                break
+            rows.append(r)
+
+    total = len(rows)
+    if truncated:
+        # keep stepping (without materializing) so small overflows still report a total
+        total += overflow
+        try:
+            while total - len(rows) <= COUNT_SCAN_LIMIT:
+                batch = cur.fetchmany(FETCH_BATCH_SIZE)
+                if not batch:
+                    break
+                total += len(batch)
+            else:
+                total = None
+        except sqlite3.OperationalError:
+            # deadline hit while counting: the capped rows are still good
+            total = None
+
+    return {
+        "rows": rows,
+        "truncated": truncated,
+        "total_row_count": total,
+    }
+
+
 class SchemaGroundingPlugin:
     """
     Schema Grounding Plugin exposing kernel functions:
       - get_table_descriptions(): returns all rows from table_description (table_name + description).
       - get_table_columns(table_names): given a list of table names, returns column metadata from table_columns.
-      - execute_sql_script(sql): (VERY SIMPLE) executes the provided SQL and returns rows & columns.
+      - get_relevant_schema(question, k): only the top-k tables (BM25 over schema metadata) plus join keys.
+      - get_table_row_estimates() / get_table_statistics(table_names): row counts and per-column
+        distinct counts, null fractions and min/max (Tools/table_stats.py).
+      - validate_sql(sql, params, max_rows): local EvaluationAgent-style checks (EXPLAIN + schema identifiers).
+      - execute_sql_script(sql, max_rows, max_bytes, result_format, params, timeout_ms): executes the provided
+        SQL and returns rows & columns, stopping at the row/byte budget, encoded as rows/tuples/columnar/arrow
+        (see Tools/result_format.py; stream_sql_rows for async streaming). Queries running past
+        timeout_ms are interrupted and reported with error_type "TIMEOUT".
     """
 
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, result_cache_bytes: int = RESULT_CACHE_MAX_BYTES):
         self.db_path = db_path or DB_PATH
+        self.pool = SQLiteConnectionPool(self.db_path)
+        # validate_sql installs an authorizer, which expires every cached statement on its
+        # connection: keep that off the connections that execute queries
+        self.validation_pool = SQLiteConnectionPool(self.db_path, size=VALIDATION_POOL_SIZE)
+        # execute_sql_script results keyed on canonical SQL + params, dropped when the db changes
+        self.result_cache = ResultCache(max_bytes=result_cache_bytes)
+        # normalized get_schema_info() result, valid while the db version is unchanged
+        self._schema_cache: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._schema_version: Optional[Tuple[int, int]] = None
+        self._schema_lock = asyncio.Lock()
+        # lexical index over the cached schema, synced lazily by get_relevant_schema()
+        self._schema_index = SchemaIndex()
+        self._schema_index_source: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._schema_fingerprint: Optional[Tuple[int, str]] = None
+        # per-table statistics, refreshed incrementally when the db version moves
+        self.table_stats = TableStatistics()
+        self._stats_version: Optional[Tuple[int, int]] = None
+        self._stats_lock = asyncio.Lock()
+        # executed queries -> index proposals (see index_advice / apply_index_advice)
+        self.index_advisor = IndexAdvisor(self.db_path)
+        self.index_reports: List[Dict[str, Any]] = []   # apply_index_advice results, oldest first
+        self._index_task: Optional[asyncio.Task] = None
 
+    def close(self) -> None:
+        """Close every pooled connection (call on app shutdown)."""
+        self.pool.close()
+        self.validation_pool.close()
 
+    async def _db_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            return await asyncio.to_thread(self.pool.database_version)
+        except Exception:
+            return None
 
-    @kernel_function(description="Return all rows from table_description and table_columns.")
+    async def warm_up(self) -> None:
+        """Populate the schema and statistics caches ahead of the first request (call on app startup)."""
+        await self.get_schema_info()
+        await self._ensure_statistics()
+
+    async def _ensure_statistics(self) -> None:
+        version = await self._db_version()
+        if version is not None and version == self._stats_version:
+            return
+
+        async with self._stats_lock:
+            version = await self._db_version()
+            if version is not None and version == self._stats_version:
+                return
+
+            schema = await self.get_schema_info()
+            tables = [t["table_name"] for t in schema["table_description"]]
+
+            def run():
+                with self.pool.connection() as conn:
+                    return self.table_stats.refresh(conn, tables)
+
+            await asyncio.to_thread(run)
+            self._stats_version = version
+
+    async def refresh_statistics(self, analyze: bool = False) -> None:
+        """
+        Re-check statistics now (e.g. right after an import). With analyze=True, also runs
+        ANALYZE so SQLite's planner statistics (sqlite_stat1) are refreshed.
+        """
+        if analyze:
+            await asyncio.to_thread(run_analyze, self.db_path)
+        self._stats_version = None
+        await self._ensure_statistics()
+
+    @kernel_function(description="Return all rows from table_description and table_columns, plus the join "
+                                 "relationships detected at import time.")
     async def get_schema_info(self) -> Dict[str, List[Dict[str, Any]]]:
+        # cached result is reused until PRAGMA schema_version / data_version move
+        version = await self._db_version()
+        if version is not None and version == self._schema_version:
+            return self._schema_cache
+
+        async with self._schema_lock:
+            version = await self._db_version()
+            if version is not None and version == self._schema_version:
+                return self._schema_cache
+
+            result = await self._load_schema_info()
+            if version is not None:
+                self._schema_cache = result
+                self._schema_version = version
+        print("i trust you!!!")
+        return result
+
+    async def schema_fingerprint(self) -> str:
+        """Stable hash of the table_columns metadata (scopes caches keyed on the schema)."""
+        schema = await self.get_schema_info()
+        if self._schema_fingerprint is None or self._schema_fingerprint[0] != id(schema):
+            raw = json.dumps(schema["table_columns"], sort_keys=True, default=str)
+            self._schema_fingerprint = (id(schema), hashlib.sha1(raw.encode("utf-8")).hexdigest())
+        return self._schema_fingerprint[1]
+
+    async def _load_schema_info(self) -> Dict[str, List[Dict[str, Any]]]:
         result = {
             "table_description": [],
-            "table_columns": []
+            "table_columns": [],
+            "relationships": []
         }
 
         # ---- FETCH table_description ----
         try:
             query = "SELECT * FROM table_description;"
-            rows = await _query_sqlite(self.db_path, query)
+            rows = await _query_sqlite(self.pool, query)
             normalized = []
             for r in rows:
                 row = {k: (v if v is not None else "") for k, v in r.items()}
@@ -74,7 +259,7 @@ class SchemaGroundingPlugin:
         # ---- FETCH table_columns ----
         try:
             query = "SELECT * FROM table_columns;"
-            rows = await _query_sqlite(self.db_path, query)
+            rows = await _query_sqlite(self.pool, query)
             normalized = []
             for r in rows:
                 row = {k: (v if v is not None else "") for k, v in r.items()}
@@ -100,45 +285,213 @@ class SchemaGroundingPlugin:
             result["table_columns"] = normalized
         except Exception:
             result["table_columns"] = []
-        print("i trust you!!!")
+
+        # ---- FETCH table_relationships (written by the importers; optional) ----
+        try:
+            query = "SELECT from_table, from_column, to_table, to_column, relationship FROM table_relationships;"
+            result["relationships"] = await _query_sqlite(self.pool, query)
+        except Exception:
+            result["relationships"] = []
         return result
 
-  
+    @kernel_function(
+        description="Return only the schema relevant to the question: the top-k tables ranked by a "
+                    "lexical index over table/column names and descriptions, their columns, and join keys."
+    )
+    async def get_relevant_schema(self, question: str, k: int = RELEVANT_SCHEMA_TOP_K) -> Dict[str, List[Dict[str, Any]]]:
+        schema = await self.get_schema_info()
+
+        # re-sync only when get_schema_info produced a new result object
+        if schema is not self._schema_index_source:
+            self._schema_index.update(schema)
+            self._schema_index_source = schema
+
+        ranked = self._schema_index.search(question, k)
+        if not ranked:
+            # nothing matched lexically: fall back to the full schema rather than guess
+            tables = [t["table_name"] for t in schema["table_description"]]
+        else:
+            tables = [name for name, _ in ranked]
+
+        wanted = set(tables)
+        return {
+            "table_description": [t for t in schema["table_description"] if t["table_name"] in wanted],
+            "table_columns": [c for c in schema["table_columns"] if c["table_name"] in wanted],
+            "join_keys": find_join_keys(schema["table_columns"], tables, schema.get("relationships")),
+        }
+
+    async def index_advice(self) -> List[Dict[str, Any]]:
+        """Index proposals for repeated full scans / automatic indexes seen in executed queries."""
+        return await asyncio.to_thread(self.index_advisor.advise, self.table_stats.get())
+
+    async def apply_index_advice(self, measure: bool = True) -> List[Dict[str, Any]]:
+        """Create the currently proposed indexes and report estimated vs. measured speedup."""
+        proposals = await self.index_advice()
+        if not proposals:
+            return []
+        report = await asyncio.to_thread(self.index_advisor.apply_advice, proposals, measure)
+        self.index_reports.extend(report)
+        for r in report:
+            print(f"[index advisor] {r['sql']} -> estimated x{r['estimated_speedup']}, "
+                  f"measured x{r['measured_speedup']}")
+        return report
+
+    @kernel_function(description="Return the estimated row count of every table: {table_name: row_count}.")
+    async def get_table_row_estimates(self) -> Dict[str, int]:
+        await self._ensure_statistics()
+        return self.table_stats.row_estimates()
+
+    @kernel_function(
+        description="Return statistics for the given tables (all tables if none given): row_count and, "
+                    "per column, distinct_count, null_fraction, min and max."
+    )
+    async def get_table_statistics(self, table_names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        await self._ensure_statistics()
+        return self.table_stats.get(table_names)
 
     @kernel_function(
-        description="Execute the provided SQL script directly on the SQLite DB and return rows & columns."
+        description="Validate a candidate SQL query locally without an LLM: SELECT-only, single statement, "
+                    "LIMIT present, date literal format, compiles (EXPLAIN), and every table/column exists "
+                    "in the grounded schema. Returns {is_valid, score, issues, feedback_for_builder}."
     )
-    async def execute_sql_script(self, sql: str) -> Dict[str, Any]:
+    async def validate_sql(
+        self,
+        sql: str,
+        params: Optional[List[Any]] = None,
+        max_rows: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        schema = await self.get_schema_info()
 
         def run():
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            try:
-                cur.execute(sql)
-                fetched = cur.fetchall()
-                cols = [c[0] for c in cur.description] if cur.description else []
-                rows = [dict(r) for r in fetched]
-                return {
-                    "success": True,
-                    "rows": rows,
-                    "columns": cols,
-                    "row_count": len(rows),
-                    "error": None
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "rows": [],
-                    "columns": [],
-                    "row_count": 0,
-                    "error": str(e)
-                }
-            finally:
+            with self.validation_pool.connection() as conn:
+                return _validate_sql(conn, sql, schema["table_columns"], params=params, max_rows=max_rows)
+
+        return await asyncio.to_thread(run)
+
+    @kernel_function(
+        description="Execute the provided SQL script directly on the SQLite DB and return rows & columns. "
+                    "At most max_rows rows are returned; 'truncated' is true when the result was cut off. "
+                    "result_format: 'rows' (list of objects), 'tuples' (column names once + row arrays, "
+                    "most compact for reading) or 'columnar' (one array per column). "
+                    "params: values for ? placeholders in the SQL. "
+                    "timeout_ms: the query is cancelled after this many milliseconds (error_type TIMEOUT)."
+    )
+    async def execute_sql_script(
+        self,
+        sql: str,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        result_format: str = "rows",
+        params: Optional[List[Any]] = None,
+        timeout_ms: int = DEFAULT_TIMEOUT_MS,
+    ) -> Dict[str, Any]:
+        max_rows = int(max_rows) if max_rows else DEFAULT_MAX_ROWS
+        max_bytes = int(max_bytes) if max_bytes else DEFAULT_MAX_BYTES
+        timeout_ms = int(timeout_ms) if timeout_ms else DEFAULT_TIMEOUT_MS
+        params = list(params or [])
+
+        # ---- result cache (skipped if the db version can't be read) ----
+        version = await self._db_version()
+        cache_key = ResultCache.make_key(
+            sql, params, max_rows=max_rows, max_bytes=max_bytes, result_format=result_format
+        )
+        if version is not None:
+            cached = self.result_cache.get(cache_key, version)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        active = {}
+
+        def run():
+            with self.pool.connection() as conn:
+                active["conn"] = conn
+                cur = conn.cursor()
+                deadline = QueryDeadline(conn, timeout_ms)
+                started = time.perf_counter()
                 try:
-                    cur.close()
-                except Exception:
-                    pass
-                conn.close()
+                    with deadline:
+                        cur.execute(sql, params)
+                        cols = [c[0] for c in cur.description] if cur.description else []
+                        fetched = _fetch_capped(cur, max_rows, max_bytes)
+                    metrics.DB_EXECUTION_LATENCY.observe(time.perf_counter() - started, status="ok")
+                    metrics.ROWS_RETURNED.observe(len(fetched["rows"]))
+                    encoded = encode_rows(cols, fetched["rows"], result_format)
+                    return {
+                        "success": True,
+                        **encoded,
+                        "row_count": len(fetched["rows"]),
+                        "truncated": fetched["truncated"],
+                        "total_row_count": fetched["total_row_count"],
+                        "error": None
+                    }
+                except Exception as e:
+                    timed_out = deadline.expired
+                    metrics.DB_EXECUTION_LATENCY.observe(time.perf_counter() - started,
+                                                         status="timeout" if timed_out else "error")
+                    return {
+                        "success": False,
+                        "rows": [],
+                        "columns": [],
+                        "row_count": 0,
+                        "truncated": False,
+                        "total_row_count": None,
+                        "error": (
+                            f"Query cancelled after exceeding the {timeout_ms} ms time limit. "
+                            "Reduce its cost: add selective WHERE filters, join on key columns, "
+                            "or aggregate before joining."
+                        ) if timed_out else str(e),
+                        "error_type": "TIMEOUT" if timed_out else "SQL_ERROR",
+                        "timeout_ms": timeout_ms,
+                    }
+                finally:
+                    active.pop("conn", None)
+                    try:
+                        cur.close()
+                    except Exception:
+                        pass
         print("it's working!!!!!!")
-        return await asyncio.to_thread(run)
+        try:
+            result = await asyncio.to_thread(run)
+        except asyncio.CancelledError:
+            # the caller went away: stop the statement instead of letting it pin the worker thread
+            conn = active.get("conn")
+            if conn is not None:
+                conn.interrupt()
+            raise
+        if version is not None and result["success"]:
+            self.result_cache.put(cache_key, version, result)
+        if INDEX_ADVISOR_ENABLED and result["success"]:
+            self.index_advisor.record(sql, params)
+        if INDEX_ADVISOR_AUTO_CREATE and result["success"] and (self._index_task is None or self._index_task.done()):
+            if self.index_advisor.pending:
+                self._index_task = asyncio.create_task(self.apply_index_advice())
+        return result
+
+    async def stream_sql_rows(
+        self,
+        sql: str,
+        max_rows: Optional[int] = None,
+        batch_size: int = FETCH_BATCH_SIZE,
+        timeout_ms: Optional[int] = DEFAULT_TIMEOUT_MS,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async generator over the rows of `sql` (as dicts), fetched in batches in a worker
+        thread so the event loop is never blocked. Stops after `max_rows` rows if given.
+        The pooled connection is held until the generator finishes or is closed; the
+        whole stream is bounded by `timeout_ms` (sqlite3.OperationalError when exceeded).
+        """
+        async with self.pool.connection_async() as conn:
+            with QueryDeadline(conn, timeout_ms):
+                cur = await asyncio.to_thread(conn.execute, sql)
+                try:
+                    sent = 0
+                    while max_rows is None or sent < max_rows:
+                        want = batch_size if max_rows is None else min(batch_size, max_rows - sent)
+                        batch = await asyncio.to_thread(cur.fetchmany, want)
+                        if not batch:
+                            break
+                        for r in batch:
+                            yield dict(r)
+                        sent += len(batch)
+                finally:
+                    cur.close()
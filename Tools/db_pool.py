@@ -0,0 +1,181 @@
+# db_pool.py
+# Bounded pool of long-lived, read-only SQLite connections used by SchemaGroundingPlugin.
+#
+# Opening a fresh sqlite3 connection per tool call throws away the page cache and forces
+# SQLite to re-parse the schema every time. The pool keeps a small set of connections open
+# (read-only URI, query_only, tuned mmap/cache sizes) and hands them out one call at a time.
+
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+# ----- CONFIG: pool / connection tuning -----
+POOL_SIZE = 4                       # max connections held open at once
+CHECKOUT_TIMEOUT = 30.0             # seconds to wait for a free connection
+CACHED_STATEMENTS = 256             # per-connection prepared statement cache
+MMAP_SIZE = 256 * 1024 * 1024       # bytes of the db file to memory-map
+CACHE_SIZE_KIB = 64 * 1024          # page cache per connection (KiB)
+PROGRESS_INTERVAL = 1000            # VM instructions between deadline checks
+# --------------------------------------------
+
+
+class QueryDeadline:
+    """
+    Context manager enforcing a wall-clock limit on statements run on `conn`.
+
+    Installs a progress handler that aborts the running statement (sqlite3 raises
+    OperationalError "interrupted") once `timeout_ms` has elapsed; `expired` tells a
+    timeout apart from other errors. `timeout_ms` of None/0 disables the limit.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, timeout_ms: Optional[int]):
+        self.conn = conn
+        self.timeout_ms = timeout_ms
+        self.expired = False
+        self._deadline = None
+
+    def _check(self) -> int:
+        if time.monotonic() >= self._deadline:
+            self.expired = True
+            return 1
+        return 0
+
+    def __enter__(self) -> "QueryDeadline":
+        if self.timeout_ms:
+            self._deadline = time.monotonic() + self.timeout_ms / 1000.0
+            self.conn.set_progress_handler(self._check, PROGRESS_INTERVAL)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.timeout_ms:
+            self.conn.set_progress_handler(None, 0)
+
+
+class SQLiteConnectionPool:
+    """
+    Thread-safe pool of read-only sqlite3 connections.
+
+    Connections are created lazily up to `size` and reused afterwards. Use
+    `connection()` as a context manager to check one out for the duration of a call, or
+    `async with connection_async()` from async code that holds it across awaits.
+    """
+
+    def __init__(self, db_path: str, size: int = POOL_SIZE, timeout: float = CHECKOUT_TIMEOUT):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=self.size)
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # dedicated connection for version probes: PRAGMA data_version is only
+        # comparable across calls made on the *same* connection
+        self._probe: Optional[sqlite3.Connection] = None
+        self._probe_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,   # connections move between asyncio.to_thread workers
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size = -{int(CACHE_SIZE_KIB)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection available after {self.timeout}s")
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if self._closed:
+            conn.close()
+            return
+        # never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for the duration of the `with` block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @asynccontextmanager
+    async def connection_async(self) -> AsyncIterator[sqlite3.Connection]:
+        """
+        Async `connection()`: waiting for a free connection (up to `timeout`) happens in a
+        worker thread, so the event loop is never blocked. If the caller is cancelled while
+        waiting, the connection the worker still gets is returned to the pool.
+        """
+        checkout = asyncio.ensure_future(asyncio.to_thread(self._acquire))
+        try:
+            conn = await asyncio.shield(checkout)
+        except asyncio.CancelledError:
+            checkout.add_done_callback(
+                lambda f: f.cancelled() or f.exception() is not None or self._release(f.result())
+            )
+            raise
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def database_version(self) -> Tuple[int, int]:
+        """
+        Return (schema_version, data_version) for the database.
+
+        The pair changes whenever the schema changes or any other connection/process
+        commits, so it can be used as a cheap invalidation token for cached metadata.
+        """
+        with self._probe_lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._probe is None:
+                self._probe = self._open()
+            schema_version = self._probe.execute("PRAGMA schema_version").fetchone()[0]
+            data_version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+            return schema_version, data_version
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            conns, self._all = self._all, []
+        with self._probe_lock:
+            if self._probe is not None:
+                conns.append(self._probe)
+                self._probe = None
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
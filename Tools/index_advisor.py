@@ -0,0 +1,314 @@
+# index_advisor.py
+# Workload-driven index advisor for queries run through SchemaGroundingPlugin.execute_sql_script.
+#
+# Executed queries are only queued (SQL text + params). When advice is requested, their
+# EXPLAIN QUERY PLAN is taken on a separate read-only connection and searched for:
+#   - "SEARCH x USING AUTOMATIC [COVERING] INDEX (col=?)": SQLite builds a throw-away index on
+#     every run (typically the inner side of a join) -> a persistent index on those columns;
+#   - "SCAN x" with filter predicates (col = ?/literal, <, >, IN, BETWEEN ...) on x -> an index
+#     on the filter columns.
+# Other columns the queries read from the table are appended so the index covers them, as long
+# as it stays small (INDEX_ADVISOR_MAX_COVERING_COLUMNS).
+# Candidates seen at least INDEX_ADVISOR_MIN_OCCURRENCES times are proposed with an estimated
+# speedup; `apply_advice` can create them and report the measured speedup on recorded queries.
+
+import itertools
+import json
+import math
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from Tools.db_pool import QueryDeadline
+from Tools.sql_validator import mask_sql
+
+# ----- CONFIG -----
+INDEX_ADVISOR_MIN_OCCURRENCES = 3   # times a scan must repeat before an index is proposed
+INDEX_ADVISOR_SAMPLE_QUERIES = 3    # recorded queries kept per candidate for measurement
+INDEX_ADVISOR_TIMING_RUNS = 3       # runs per query when measuring (median is reported)
+INDEX_ADVISOR_MAX_PENDING = 1000    # distinct queries queued between analyses (more are not recorded)
+INDEX_ADVISOR_MAX_COVERING_COLUMNS = 5   # key + other read columns above this -> plain (non-covering) index
+INDEX_ADVISOR_TIMING_TIMEOUT_MS = 2000   # per-run limit for a measured query; slower -> not measured
+INDEX_ADVISOR_TIMING_MAX_ROWS = 1000     # rows stepped per measured query (none are kept)
+# ------------------
+
+_IDENT = r'(?:"(?:[^"]|"")*"|[A-Za-z_][A-Za-z0-9_]*)'
+_QUALIFIED = rf"(?:({_IDENT})\s*\.\s*)?({_IDENT})"
+_VALUE = r"(?:''|\?|[-+]?\d+(?:\.\d+)?)"
+_CMP = r"(?:==|=|<>|!=|<=|>=|<|>)"
+_FILTER_PATTERNS = [
+    re.compile(rf"{_QUALIFIED}\s*{_CMP}\s*{_VALUE}", re.IGNORECASE),
+    re.compile(rf"{_VALUE}\s*{_CMP}\s*{_QUALIFIED}", re.IGNORECASE),
+    re.compile(rf"{_QUALIFIED}\s+(?:not\s+)?(?:in\s*\(|between\b|is\b)", re.IGNORECASE),
+]
+_AUTO_INDEX = re.compile(r"^SEARCH (\S+) USING AUTOMATIC (?:COVERING |PARTIAL )*INDEX \((.*)\)$")
+_SCAN = re.compile(r"^SCAN (\S+)$")
+
+_KEYWORDS = {
+    "on", "where", "join", "inner", "left", "right", "full", "cross", "natural", "group", "order",
+    "limit", "union", "except", "intersect", "using", "having", "window", "as", "select", "from",
+}
+
+
+def _unquote(ident: str) -> str:
+    if ident.startswith('"') and ident.endswith('"'):
+        return ident[1:-1].replace('""', '"')
+    return ident
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _aliases(skeleton: str, tables: Set[str]) -> Dict[str, str]:
+    """Map alias (and table name) -> table for every table referenced in the query."""
+    mapping = {t.lower(): t for t in tables}
+    for table in tables:
+        pattern = rf'(?<![\w."])(?:{re.escape(_quote(table))}|{re.escape(table)}(?![\w"]))\s+(?:as\s+)?({_IDENT})'
+        for m in re.finditer(pattern, skeleton, re.IGNORECASE):
+            alias = _unquote(m.group(1))
+            if alias.lower() not in _KEYWORDS:
+                mapping[alias.lower()] = table
+    return mapping
+
+
+def _filter_columns(skeleton: str, aliases: Dict[str, str], reads: Set[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """Columns compared against constants/placeholders, grouped by table."""
+    by_table: Dict[str, List[str]] = {}
+    for pattern in _FILTER_PATTERNS:
+        for m in pattern.finditer(skeleton):
+            qualifier, column = m.group(1), m.group(2)
+            column = _unquote(column)
+            if qualifier:
+                owners = [aliases.get(_unquote(qualifier).lower())]
+            else:
+                owners = [t for t, c in reads if c.lower() == column.lower()]
+            for table in owners:
+                if not table:
+                    continue
+                real = next((c for t, c in reads if t == table and c.lower() == column.lower()), None)
+                if real and real not in by_table.setdefault(table, []):
+                    by_table[table].append(real)
+    return by_table
+
+
+class IndexAdvisor:
+    """
+    Thread-safe workload recorder. `record` is called after each successful execution and
+    only queues the SQL text; `advise` runs EXPLAIN QUERY PLAN for the queued queries on its
+    own short-lived read-only connection (never the request connections, whose statement
+    cache an authorizer would expire) and turns repeated full scans into index proposals.
+    """
+
+    def __init__(self, db_path: str, min_occurrences: int = INDEX_ADVISOR_MIN_OCCURRENCES):
+        self.db_path = db_path
+        self.min_occurrences = min_occurrences
+        self._pending: Counter = Counter()   # (sql, params json) -> executions not analyzed yet
+        self._counts: Counter = Counter()
+        self._samples: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[str, List[Any]]]] = {}
+        self._kinds: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        self._include: Dict[Tuple[str, Tuple[str, ...]], Set[str]] = {}
+        self._applied: Set[Tuple[str, Tuple[str, ...]]] = set()
+        self._lock = threading.Lock()
+        self._analyze_lock = threading.Lock()
+        self.queries_recorded = 0
+        self.queries_dropped = 0
+
+    def record(self, sql: str, params: Optional[List[Any]] = None) -> None:
+        """Queue an executed query for the next analysis (no database access)."""
+        key = (sql, json.dumps(list(params or []), default=str))
+        with self._lock:
+            self.queries_recorded += 1
+            if key not in self._pending and len(self._pending) >= INDEX_ADVISOR_MAX_PENDING:
+                self.queries_dropped += 1
+                return
+            self._pending[key] += 1
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _analyze_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        conn = _readonly_connection(self.db_path)
+        try:
+            for (sql, params_json), n in pending.items():
+                params = json.loads(params_json)
+                try:
+                    candidates = _plan_candidates(conn, sql, params)
+                except sqlite3.Error:
+                    continue
+                with self._lock:
+                    for table, cols, kind, include in candidates:
+                        key = (table, cols)
+                        self._counts[key] += n
+                        self._kinds[key] = kind
+                        self._include.setdefault(key, set()).update(include)
+                        samples = self._samples.setdefault(key, [])
+                        if len(samples) < INDEX_ADVISOR_SAMPLE_QUERIES and (sql, params) not in samples:
+                            samples.append((sql, params))
+        finally:
+            conn.close()
+
+    def advise(self, table_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze the queued queries, then return index proposals for candidates seen at least
+        `min_occurrences` times. Other columns the queries read from the table are appended
+        (covering index) while the index stays within INDEX_ADVISOR_MAX_COVERING_COLUMNS.
+        `table_stats` (TableStatistics.get()) is used for the estimated speedup:
+        full scan of N rows vs. log2(N) + N / distinct(first column) rows read.
+        """
+        with self._analyze_lock:
+            self._analyze_pending()
+        table_stats = table_stats or {}
+        proposals = []
+        with self._lock:
+            items = [(k, n, sorted(self._include.get(k, ())))
+                     for k, n in self._counts.items() if n >= self.min_occurrences and k not in self._applied]
+        for (table, cols), occurrences, include in sorted(items, key=lambda x: -x[1]):
+            stats = table_stats.get(table) or {}
+            rows = stats.get("row_count")
+            estimate = None
+            if rows:
+                distinct = (stats.get("columns", {}).get(cols[0]) or {}).get("distinct_count") or 1
+                estimate = round(rows / (math.log2(max(rows, 2)) + rows / max(distinct, 1)), 1)
+            covering = bool(include) and len(cols) + len(include) <= INDEX_ADVISOR_MAX_COVERING_COLUMNS
+            index_cols = list(cols) + (include if covering else [])
+            name = "idx_" + re.sub(r"\W+", "_", f"{table}_{'_'.join(index_cols)}").strip("_").lower()
+            proposals.append({
+                "table": table,
+                "columns": list(cols),
+                "include_columns": include if covering else [],
+                "covering": covering,
+                "reason": self._kinds.get((table, cols)),
+                "occurrences": occurrences,
+                "index_name": name,
+                "sql": f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} "
+                       f"({', '.join(_quote(c) for c in index_cols)})",
+                "estimated_speedup": estimate,
+            })
+        return proposals
+
+    def apply_advice(self, proposals: List[Dict[str, Any]], measure: bool = True) -> List[Dict[str, Any]]:
+        """
+        Create the proposed indexes on a short-lived writable connection, then ANALYZE.
+        With `measure`, recorded sample queries are timed before and after each index on a
+        separate read-only connection, each run bounded by INDEX_ADVISOR_TIMING_TIMEOUT_MS.
+        """
+        conn = sqlite3.connect(self.db_path)
+        timing = _readonly_connection(self.db_path) if measure else None
+        report = []
+        try:
+            for p in proposals:
+                key = (p["table"], tuple(p["columns"]))
+                with self._lock:
+                    samples = list(self._samples.get(key, []))
+                before = _time_queries(timing, samples) if measure else None
+                conn.execute(p["sql"])
+                conn.execute(f"ANALYZE {_quote(p['table'])}")
+                conn.commit()
+                after = _time_queries(timing, samples) if measure else None
+                with self._lock:
+                    self._applied.add(key)
+                report.append({
+                    **p,
+                    "created": True,
+                    "before_ms": before,
+                    "after_ms": after,
+                    "measured_speedup": round(before / after, 1) if before and after else None,
+                })
+        finally:
+            conn.close()
+            if timing is not None:
+                timing.close()
+        return report
+
+
+def _plan_candidates(conn: sqlite3.Connection, sql: str, params: List[Any]) -> List[Tuple[str, Tuple[str, ...], str, Set[str]]]:
+    """(table, key columns, reason, other columns read from the table) for every index candidate in the plan."""
+    reads: Set[Tuple[str, str]] = set()
+
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ and arg1:
+            reads.add((arg1, arg2 or ""))
+        return sqlite3.SQLITE_OK
+
+    conn.set_authorizer(authorizer)
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    finally:
+        conn.set_authorizer(None)
+
+    skeleton, _ = mask_sql(sql)
+    tables = {t for t, _ in reads if not t.startswith("sqlite_")}
+    aliases = _aliases(skeleton, tables)
+    filters = None
+
+    candidates = []
+    for row in plan:
+        detail = row[-1]
+        m = _AUTO_INDEX.match(detail)
+        if m:
+            table = aliases.get(_unquote(m.group(1)).lower())
+            cols = [c.split("=")[0].strip() for c in re.split(r"\s+AND\s+", m.group(2))]
+            cols = [c.strip("<>= ") for c in cols if c]
+            if table and cols:
+                candidates.append((table, tuple(cols), "automatic index (join)"))
+            continue
+        m = _SCAN.match(detail)
+        if m:
+            table = aliases.get(_unquote(m.group(1)).lower())
+            if not table:
+                continue
+            if filters is None:
+                filters = _filter_columns(skeleton, aliases, reads)
+            cols = filters.get(table)
+            if cols:
+                candidates.append((table, tuple(cols), "full scan with filter"))
+
+    return [
+        (table, cols, kind, {c for t, c in reads if t == table and c and c not in cols})
+        for table, cols, kind in candidates
+    ]
+
+
+def _readonly_connection(db_path: str) -> sqlite3.Connection:
+    # plans and timings replay recorded queries as-is: never on a connection that could write
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def _time_queries(conn: sqlite3.Connection, samples: List[Tuple[str, List[Any]]]) -> Optional[float]:
+    """
+    Median wall time (ms) of running all `samples` once, over INDEX_ADVISOR_TIMING_RUNS runs.
+    Rows are stepped (up to INDEX_ADVISOR_TIMING_MAX_ROWS per query) but not kept. Returns None
+    when there is nothing to time or a run fails / exceeds INDEX_ADVISOR_TIMING_TIMEOUT_MS.
+    """
+    if not samples:
+        return None
+    runs = []
+    for _ in range(INDEX_ADVISOR_TIMING_RUNS):
+        t0 = time.perf_counter()
+        for sql, params in samples:
+            cur = conn.cursor()
+            try:
+                with QueryDeadline(conn, INDEX_ADVISOR_TIMING_TIMEOUT_MS):
+                    cur.execute(sql, params)
+                    for _row in itertools.islice(cur, INDEX_ADVISOR_TIMING_MAX_ROWS):
+                        pass
+            except sqlite3.Error:
+                return None
+            finally:
+                cur.close()
+        runs.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(runs), 3)
@@ -0,0 +1,195 @@
+# metrics.py
+# In-process counters / histograms rendered in the Prometheus text exposition format
+# (served by GET /api/metrics).
+#
+# Metrics are module-level objects; `observe`/`inc` are thread-safe and cheap enough to call
+# on every request. Values owned by other components (result cache, semantic cache, thread
+# store) are pulled at scrape time through registered collectors instead of being copied.
+# `function_invocation_filter` is a Semantic Kernel FUNCTION_INVOCATION filter, so every
+# kernel function of every registered plugin is timed without per-plugin code.
+
+import asyncio
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# ----- CONFIG -----
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 250, 500, 1000, 5000, 10000)
+# ------------------
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_fmt(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def time(self, **labels: Any) -> "_Timer":
+        """Time a `with` block; a `status` label becomes "error" / "cancelled" if the block raises."""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), series["counts"]):
+                    cumulative += n
+                    le = 'le="' + _fmt(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(series['sum'])}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series['count']}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        labels = self.labels
+        if exc_type is not None and "status" in labels:
+            # a failed block is never recorded under the caller's success status
+            labels = {**labels, "status": "cancelled" if issubclass(exc_type, asyncio.CancelledError) else "error"}
+        self.histogram.observe(time.perf_counter() - self.started, **labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]) -> None:
+        """`collector()` yields (name, type, help, labels, value) samples at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        families: Dict[str, Dict[str, Any]] = {}   # samples of one metric must be contiguous
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception:
+                continue
+            for name, kind, help_text, labels, value in samples:
+                family = families.setdefault(name, {"kind": kind, "help": help_text, "samples": []})
+                family["samples"].append(f"{name}{_labels(list(labels), list(labels.values()))} {_fmt(value)}")
+        for name, family in families.items():
+            lines += [f"# HELP {name} {family['help']}", f"# TYPE {name} {family['kind']}", *family["samples"]]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "nl2sql_http_request_duration_seconds", "HTTP request latency (until the response starts).",
+    ("method", "path", "status")))
+LLM_CALL_LATENCY = REGISTRY.register(Histogram(
+    "nl2sql_llm_call_duration_seconds", "LLM agent call latency by agent.", ("agent", "status")))
+FUNCTION_LATENCY = REGISTRY.register(Histogram(
+    "nl2sql_kernel_function_duration_seconds", "Kernel function invocation latency.", ("plugin", "function", "status")))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "nl2sql_pipeline_stage_duration_seconds", "NL2SQLPipeline stage latency.", ("stage",)))
+DB_EXECUTION_LATENCY = REGISTRY.register(Histogram(
+    "nl2sql_db_execution_duration_seconds", "SQL execution time in execute_sql_script (cache misses).", ("status",)))
+ROWS_RETURNED = REGISTRY.register(Histogram(
+    "nl2sql_rows_returned", "Rows returned by execute_sql_script (cache misses).", (), buckets=ROW_BUCKETS))
+RETRIES = REGISTRY.register(Counter(
+    "nl2sql_retries_total", "Pipeline retries used (kind=eval: extra Builder rounds, kind=debug: Debug calls).", ("kind",)))
+PIPELINE_RUNS = REGISTRY.register(Counter(
+    "nl2sql_pipeline_runs_total", "Pipeline turns by outcome.", ("outcome",)))
+LLM_CALLS = REGISTRY.register(Counter(
+    "nl2sql_llm_calls_total", "LLM calls made by the pipeline.", ()))
+
+
+def cache_collector(name: str, stats: Callable[[], Dict[str, Any]]):
+    """Collector exposing hits/misses/entries of a cache with a `stats()` dict (ResultCache, SemanticCache)."""
+    def collect():
+        s = stats()
+        yield "nl2sql_cache_hits_total", "counter", "Cache hits.", {"cache": name}, s.get("hits", 0)
+        yield "nl2sql_cache_misses_total", "counter", "Cache misses.", {"cache": name}, s.get("misses", 0)
+        if "entries" in s:
+            yield "nl2sql_cache_entries", "gauge", "Entries currently cached.", {"cache": name}, s["entries"]
+    return collect
+
+
+async def function_invocation_filter(context, next) -> None:
+    """Semantic Kernel FUNCTION_INVOCATION filter timing every kernel function."""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        await next(context)
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        FUNCTION_LATENCY.observe(
+            time.perf_counter() - started,
+            plugin=context.function.plugin_name or "",
+            function=context.function.name,
+            status=status,
+        )
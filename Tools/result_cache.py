@@ -0,0 +1,156 @@
+# result_cache.py
+# LRU cache for execute_sql_script results.
+#
+# Keys are canonicalized SQL text + parameters + execution options; every entry is tagged with
+# the database version (PRAGMA schema_version / data_version) it was computed against and is
+# dropped as soon as the database changes. Eviction is LRU under a byte budget.
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# ----- CONFIG -----
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024   # total (approximate) size of cached results
+RESULT_CACHE_MAX_ENTRY_FRACTION = 0.25      # never cache a single result larger than this share
+# ------------------
+
+# string literals, quoted identifiers, comments, whitespace -- in that order of precedence
+_SQL_TOKEN = re.compile(
+    r"""('(?:[^']|'')*')"""          # 'string literal'
+    r"""|("(?:[^"]|"")*")"""         # "quoted identifier"
+    r"""|(`[^`]*`|\[[^\]]*\])"""     # `mysql` / [mssql] style identifiers
+    r"""|(--[^\n]*|/\*.*?\*/)"""     # comments
+    r"""|(\s+)""",                   # whitespace
+    re.DOTALL,
+)
+
+
+def _normalize_code(text: str) -> str:
+    # whitespace and punctuation spacing of SQL text outside literals / quoted identifiers
+    text = re.sub(r"\s+", " ", text.lower())
+    return re.sub(r"\s*([(),=<>])\s*", r"\1", text)
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Canonical form of `sql` for cache keys: comments removed, whitespace collapsed,
+    keywords/unquoted identifiers lowercased (SQLite treats them case-insensitively),
+    trailing semicolons dropped. Literals and quoted identifiers are kept verbatim, so
+    'a , b' and 'a,b' stay different keys.
+    """
+    sql = sql or ""
+    out, code, pos = [], [], 0
+    for m in _SQL_TOKEN.finditer(sql):
+        code.append(sql[pos:m.start()])
+        literal, ident, other_ident, comment, space = m.groups()
+        if literal or ident or other_ident:
+            out.append(_normalize_code("".join(code)))
+            out.append(m.group(0))
+            code = []
+        else:
+            code.append(" ")
+        pos = m.end()
+    code.append(sql[pos:])
+    out.append(_normalize_code("".join(code)).rstrip("; "))
+    out[0] = out[0].lstrip()
+    return "".join(out)
+
+
+def _copy(value: Any) -> Any:
+    # rows are lists / dicts inside the result dict: copy every level a caller could mutate
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _approx_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return len(repr(value))
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of query results with a byte budget and hit/miss counters.
+    Entries are only valid for the database version they were stored under. Values are
+    copied on the way in and out, so callers may mutate what they stored or got back.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(sql: str, params: Optional[Any] = None, **options: Any) -> Hashable:
+        params_key = json.dumps(list(params or []), default=str)
+        return canonicalize_sql(sql), params_key, tuple(sorted(options.items()))
+
+    def _check_version(self, version: Hashable) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+        return _copy(value)
+
+    def put(self, key: Hashable, version: Hashable, value: Any) -> bool:
+        """Store `value`; returns False when it is too large to cache."""
+        size = _approx_size(value)
+        if size > self.max_bytes * RESULT_CACHE_MAX_ENTRY_FRACTION:
+            return False
+        value = _copy(value)
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
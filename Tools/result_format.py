@@ -0,0 +1,82 @@
+# result_format.py
+# Result encodings for SchemaGroundingPlugin.execute_sql_script.
+#
+#   "rows"     -> {"rows": [{"col": value, ...}, ...]}       (original list-of-dicts format)
+#   "tuples"   -> {"rows": [[value, ...], ...]}               (column names sent once in "columns")
+#   "columnar" -> {"data": [[col0 values], [col1 values], ...]}  (one array per column)
+#   "arrow"    -> {"arrow_ipc": "<base64 Arrow IPC stream>"}  (requires pyarrow)
+#
+# Every encoding also carries "columns" and "format". `to_numpy_columns` turns a columnar
+# result into NumPy arrays (numeric columns get typed buffers) for in-process callers.
+
+import base64
+from typing import Any, Dict, List, Sequence
+
+# Optional dependencies
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except Exception:
+    ARROW_AVAILABLE = False
+
+RESULT_FORMATS = ("rows", "tuples", "columnar", "arrow")
+
+
+def encode_rows(columns: List[str], rows: Sequence[Sequence[Any]], result_format: str = "rows") -> Dict[str, Any]:
+    """
+    Encode fetched rows (tuples or sqlite3.Row) as `result_format`.
+    Raises ValueError for an unknown format or when "arrow" is requested without pyarrow.
+    """
+    result_format = (result_format or "rows").lower()
+
+    if result_format == "rows":
+        return {"format": "rows", "columns": columns, "rows": [dict(zip(columns, r)) for r in rows]}
+
+    if result_format == "tuples":
+        return {"format": "tuples", "columns": columns, "rows": [list(r) for r in rows]}
+
+    if result_format == "columnar":
+        data = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+        return {"format": "columnar", "columns": columns, "data": data}
+
+    if result_format == "arrow":
+        if not ARROW_AVAILABLE:
+            raise ValueError("result_format 'arrow' requires pyarrow to be installed")
+        data = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+        table = pa.table({c: data[i] for i, c in enumerate(columns)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        payload = base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+        return {"format": "arrow", "columns": columns, "arrow_ipc": payload}
+
+    raise ValueError(f"Unknown result_format '{result_format}', expected one of {RESULT_FORMATS}")
+
+
+def to_numpy_columns(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a "columnar" result into {column: numpy array}. Columns holding only ints/floats
+    (NULLs become NaN) get float64/int64 buffers; everything else becomes an object array.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("to_numpy_columns requires numpy to be installed")
+    if result.get("format") != "columnar":
+        raise ValueError("to_numpy_columns expects a 'columnar' result")
+
+    out = {}
+    for name, values in zip(result["columns"], result["data"]):
+        non_null = [v for v in values if v is not None]
+        if non_null and all(isinstance(v, int) and not isinstance(v, bool) for v in non_null) \
+                and len(non_null) == len(values):
+            out[name] = np.asarray(values, dtype=np.int64)
+        elif non_null and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in non_null):
+            out[name] = np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+        else:
+            out[name] = np.asarray(values, dtype=object)
+    return out
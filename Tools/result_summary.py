@@ -0,0 +1,161 @@
+# result_summary.py
+# Compact statistical digest of an execute_sql_script result for the ExplanationAgent.
+#
+# Instead of up to max_rows raw rows, the agent gets per-column statistics computed locally
+# with NumPy (type, count, nulls, distinct, min/max/mean/std/quantiles for numeric columns,
+# top-k values and lengths for text columns) plus a few sample rows. The digest is shrunk
+# until its JSON fits `max_chars`, so the explanation prompt stays the same size no matter
+# how many rows the query returned. Results that fit whole are passed through complete.
+# Built by NL2SQLPipeline's explain stage, so only pipeline-mode turns (ChatRequest.mode=
+# "pipeline") get it; in the default orchestrator mode the LLM sees the raw execution result.
+
+import base64
+import json
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Optional dependencies
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except Exception:
+    ARROW_AVAILABLE = False
+
+# ----- CONFIG -----
+DIGEST_TOP_K = 5              # most frequent values reported per text column
+DIGEST_SAMPLE_ROWS = 5        # sample rows included with the statistics
+DIGEST_MAX_CHARS = 4000       # size cap for the JSON digest
+DIGEST_QUANTILES = (0.25, 0.5, 0.75)
+DIGEST_VALUE_CHARS = 64       # long text values are truncated to this length
+# ------------------
+
+
+# dropped from every column (before whole columns are dropped) when the digest is over the cap
+_SECONDARY_STATS = ("std", "sum", "length", "quantiles")
+
+
+def _short(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > DIGEST_VALUE_CHARS:
+        return value[:DIGEST_VALUE_CHARS] + "..."
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return value
+
+
+def _num(value: float) -> Any:
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 4)
+
+
+def result_columns(result: Dict[str, Any]) -> Tuple[List[str], List[List[Any]]]:
+    """(column names, one list of values per column) for any execute_sql_script result format."""
+    columns = list(result.get("columns", []))
+    fmt = result.get("format", "rows")
+    if fmt == "columnar":
+        return columns, [list(c) for c in result.get("data", [])]
+    if fmt == "arrow":
+        if not ARROW_AVAILABLE:
+            raise ValueError("summarizing an 'arrow' result requires pyarrow to be installed")
+        reader = pa.ipc.open_stream(base64.b64decode(result["arrow_ipc"]))
+        table = reader.read_all()
+        return columns, [table.column(c).to_pylist() for c in columns]
+    rows = result.get("rows", [])
+    if fmt == "rows":
+        return columns, [[r.get(c) for r in rows] for c in columns]
+    return columns, [list(c) for c in zip(*rows)] if rows else [[] for _ in columns]
+
+
+def summarize_column(values: List[Any], top_k: int = DIGEST_TOP_K) -> Dict[str, Any]:
+    non_null = [v for v in values if v is not None]
+    summary: Dict[str, Any] = {"count": len(non_null), "nulls": len(values) - len(non_null)}
+    if not non_null:
+        summary["type"] = "null"
+        return summary
+
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in non_null)
+    if numeric:
+        arr = np.asarray(non_null, dtype=np.float64)
+        arr = arr[~np.isnan(arr)]
+        summary["type"] = "integer" if all(isinstance(v, int) for v in non_null) else "real"
+        summary["distinct"] = int(np.unique(arr).size)
+        if arr.size:
+            summary.update({
+                "min": _num(arr.min()),
+                "max": _num(arr.max()),
+                "mean": _num(arr.mean()),
+                "std": _num(arr.std()),
+                "sum": _num(arr.sum()),
+                "quantiles": {f"p{int(q * 100)}": _num(v) for q, v in zip(DIGEST_QUANTILES, np.quantile(arr, DIGEST_QUANTILES))},
+            })
+        return summary
+
+    text = [v if isinstance(v, str) else str(v) for v in non_null]
+    counts = Counter(text)
+    lengths = np.fromiter((len(t) for t in text), dtype=np.int64, count=len(text))
+    summary.update({
+        "type": "text",
+        "distinct": len(counts),
+        "min": _short(min(text)),
+        "max": _short(max(text)),
+        "length": {"min": int(lengths.min()), "max": int(lengths.max()), "mean": _num(lengths.mean())},
+        "top_values": [[_short(v), n] for v, n in counts.most_common(top_k)],
+    })
+    return summary
+
+
+def summarize_result(
+    result: Dict[str, Any],
+    max_chars: int = DIGEST_MAX_CHARS,
+    top_k: int = DIGEST_TOP_K,
+    sample_rows: int = DIGEST_SAMPLE_ROWS,
+) -> Dict[str, Any]:
+    """
+    Digest of `result`: {"row_count", "truncated", "complete", "columns": {name: stats},
+    "sample_rows"}. "complete" is true when sample_rows holds every returned row.
+    """
+    columns, data = result_columns(result)
+    n_rows = len(data[0]) if data else 0
+    rows = [list(r) for r in zip(*data)] if data else []
+
+    # small result: the rows themselves are the most useful digest
+    complete = {
+        "row_count": result.get("row_count", n_rows),
+        "truncated": bool(result.get("truncated")),
+        "complete": True,
+        "columns": columns,
+        "sample_rows": [[_short(v) for v in r] for r in rows],
+    }
+    if len(json.dumps(complete, default=str)) <= max_chars:
+        return complete
+
+    digest = {
+        "row_count": result.get("row_count", n_rows),
+        "truncated": bool(result.get("truncated")),
+        "complete": False,
+        "columns": {c: summarize_column(v, top_k) for c, v in zip(columns, data)},
+        "sample_rows": [[_short(v) for v in r] for r in rows[:sample_rows]],
+    }
+
+    # shrink until the cap holds: fewer samples, fewer top values, terser stats, then fewer columns
+    while len(json.dumps(digest, default=str)) > max_chars:
+        if digest["sample_rows"]:
+            digest["sample_rows"].pop()
+            continue
+        if any(len(stats.get("top_values", [])) > 1 for stats in digest["columns"].values()):
+            for stats in digest["columns"].values():
+                if len(stats.get("top_values", [])) > 1:
+                    stats["top_values"].pop()
+            continue
+        if any(k in stats for stats in digest["columns"].values() for k in _SECONDARY_STATS):
+            for stats in digest["columns"].values():
+                for k in _SECONDARY_STATS:
+                    stats.pop(k, None)
+            continue
+        if len(digest["columns"]) <= 1:
+            break
+        dropped = list(digest["columns"])[-1]
+        del digest["columns"][dropped]
+        digest.setdefault("omitted_columns", []).append(dropped)
+    return digest
@@ -0,0 +1,200 @@
+# schema_index.py
+# Local lexical (BM25) index over the schema metadata used by SchemaGroundingPlugin.get_relevant_schema.
+#
+# One "document" per table: table name, table description, column names and column descriptions.
+# The index is rebuilt incrementally: only tables whose metadata changed are re-tokenized,
+# then the (cheap) corpus statistics are recomputed.
+
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# ----- CONFIG: BM25 parameters -----
+BM25_K1 = 1.5
+BM25_B = 0.75
+TABLE_NAME_WEIGHT = 3     # table name tokens are repeated this many times in the document
+COLUMN_NAME_WEIGHT = 2    # column name tokens are repeated this many times in the document
+MIN_RELATIVE_SCORE = 0.25 # drop tables scoring below this fraction of the best match
+# -----------------------------------
+
+# abbreviations commonly found in exported column names
+_ALIASES = {
+    "emp": "employee",
+    "empid": "employee id",
+    "dept": "department",
+    "dob": "date of birth",
+    "qty": "quantity",
+    "amt": "amount",
+    "num": "number",
+    "no": "number",
+}
+
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "by", "with", "is", "are",
+    "was", "were", "be", "what", "which", "who", "how", "many", "much", "show", "list", "give",
+    "me", "all", "each", "per", "from", "that", "this", "their", "there", "do", "does", "did",
+    "get", "find", "have", "has", "than", "as", "at", "it", "its", "i", "we", "you",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split identifiers and free text into normalized lowercase tokens.
+    Handles camelCase / snake_case / "Spaced Names", expands common abbreviations
+    and strips a plural 's' so "employees" matches "employee".
+    """
+    if not text:
+        return []
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(text))
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    tokens = []
+    for raw in re.findall(r"[a-z0-9]+", text.lower()):
+        for tok in _ALIASES.get(raw, raw).split():
+            if tok in _STOPWORDS:
+                continue
+            if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+                tok = tok[:-1]
+            tokens.append(tok)
+    return tokens
+
+
+def column_key(name: str) -> str:
+    """Normalized column identity used to match join keys across tables (EmpID == "Employee ID")."""
+    return "_".join(tokenize(name))
+
+
+def find_join_keys(
+    table_columns: List[Dict[str, Any]],
+    tables: List[str],
+    relationships: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Return candidate join keys between `tables`. Relationships verified against the data at
+    import time (table_relationships) come first, with their "relationship" kind; then columns
+    whose normalized names match across two tables and look like identifiers (end in
+    "id"/"key"/"code").
+    """
+    wanted = set(tables)
+    join_keys = []
+    seen = set()
+    for rel in relationships or []:
+        if rel["from_table"] not in wanted or rel["to_table"] not in wanted:
+            continue
+        join_keys.append({
+            "left_table": rel["from_table"],
+            "left_column": rel["from_column"],
+            "right_table": rel["to_table"],
+            "right_column": rel["to_column"],
+            "relationship": rel.get("relationship") or "",
+        })
+        seen.add(frozenset([(rel["from_table"], rel["from_column"]), (rel["to_table"], rel["to_column"])]))
+
+    by_key: Dict[str, List[Tuple[str, str]]] = {}
+    for col in table_columns:
+        if col["table_name"] not in wanted:
+            continue
+        key = column_key(col["column_name"])
+        if not key.endswith(("id", "key", "code")):
+            continue
+        by_key.setdefault(key, []).append((col["table_name"], col["column_name"]))
+
+    for refs in by_key.values():
+        for i in range(len(refs)):
+            for j in range(i + 1, len(refs)):
+                if refs[i][0] == refs[j][0] or frozenset([refs[i], refs[j]]) in seen:
+                    continue
+                join_keys.append({
+                    "left_table": refs[i][0],
+                    "left_column": refs[i][1],
+                    "right_table": refs[j][0],
+                    "right_column": refs[j][1],
+                })
+    return join_keys
+
+
+class SchemaIndex:
+    """
+    BM25 index with one document per table.
+
+    Call `update(schema_info)` with the output of SchemaGroundingPlugin.get_schema_info;
+    unchanged tables keep their token counts, only new/changed tables are re-tokenized.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._fingerprints: Dict[str, str] = {}
+        self._docs: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._idf: Dict[str, float] = {}
+        self._avgdl = 0.0
+
+    @staticmethod
+    def _table_text(table: str, description: str, columns: List[Dict[str, Any]]) -> List[str]:
+        tokens = tokenize(table) * TABLE_NAME_WEIGHT + tokenize(description)
+        for col in columns:
+            tokens += tokenize(col["column_name"]) * COLUMN_NAME_WEIGHT
+            tokens += tokenize(col.get("description") or "")
+        return tokens
+
+    def update(self, schema_info: Dict[str, List[Dict[str, Any]]]) -> int:
+        """Sync the index with `schema_info`. Returns the number of re-indexed tables."""
+        descriptions = {t["table_name"]: t.get("description") or "" for t in schema_info.get("table_description", [])}
+        columns: Dict[str, List[Dict[str, Any]]] = {}
+        for col in schema_info.get("table_columns", []):
+            columns.setdefault(col["table_name"], []).append(col)
+
+        tables = set(descriptions) | set(columns)
+        changed = 0
+        for table in tables:
+            cols = columns.get(table, [])
+            raw = repr((table, descriptions.get(table, ""), [(c["column_name"], c.get("description") or "") for c in cols]))
+            fingerprint = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+            if self._fingerprints.get(table) == fingerprint:
+                continue
+            tokens = self._table_text(table, descriptions.get(table, ""), cols)
+            self._docs[table] = Counter(tokens)
+            self._lengths[table] = len(tokens)
+            self._fingerprints[table] = fingerprint
+            changed += 1
+
+        for table in list(self._docs):
+            if table not in tables:
+                del self._docs[table], self._lengths[table], self._fingerprints[table]
+                changed += 1
+
+        if changed:
+            self._recompute_stats()
+        return changed
+
+    def _recompute_stats(self) -> None:
+        n = len(self._docs)
+        self._avgdl = (sum(self._lengths.values()) / n) if n else 0.0
+        df: Counter = Counter()
+        for doc in self._docs.values():
+            df.update(doc.keys())
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def search(self, question: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Return up to `k` (table_name, score) pairs, best first. Tables with no matching
+        terms, or scoring far below the best match, are left out.
+        """
+        terms = tokenize(question)
+        scores = []
+        for table, doc in self._docs.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[table] / (self._avgdl or 1.0))
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((table, score))
+        scores.sort(key=lambda x: (-x[1], x[0]))
+        if scores:
+            cutoff = scores[0][1] * MIN_RELATIVE_SCORE
+            scores = [s for s in scores if s[1] >= cutoff]
+        return scores[:max(1, k)]
@@ -0,0 +1,228 @@
+# semantic_cache.py
+# Question -> validated SQL cache used by NL2SQLPipeline to skip the Builder/Evaluate LLM calls
+# on repeat (or reworded) questions.
+#
+# Questions are embedded locally as hashed character n-gram + word vectors (no model, no network)
+# and compared with cosine similarity in one NumPy matrix product. Intent / aggregate words
+# ("how many", "average", "each", "show", ...) are kept in the embedding and must also match
+# exactly, so "how many employees per department" never reuses the SQL of "show all employees
+# in each department". Entries are scoped by a schema
+# fingerprint: the first lookup/store with a new fingerprint (table_columns changed) drops every
+# entry. Otherwise entries are evicted by LRU (max_entries) and TTL.
+# Only pipeline-mode turns (ChatRequest.mode="pipeline") use it; the default orchestrator mode
+# never consults it.
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ----- CONFIG -----
+SEMANTIC_CACHE_DIM = 4096           # hashed feature space
+SEMANTIC_CACHE_NGRAM = 3            # character n-gram size
+SEMANTIC_CACHE_THRESHOLD = 0.90     # cosine similarity needed for a confident hit
+SEMANTIC_CACHE_MAX_ENTRIES = 2000
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 3600
+# ------------------
+
+_LITERAL = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:[./-]\d+)*")
+
+# words that change which SQL answers the question, by the clause they imply
+_INTENT_WORDS = {
+    "count": {"many", "count", "number", "headcount"},
+    "sum": {"total", "sum"},
+    "avg": {"average", "avg", "mean"},
+    "min": {"min", "minimum", "lowest", "least", "smallest", "fewest"},
+    "max": {"max", "maximum", "highest", "most", "largest", "top"},
+    "group": {"per", "each", "by", "every"},
+    "list": {"show", "list", "which", "who", "all", "display"},
+    "distinct": {"distinct", "unique", "different"},
+    "order": {"sort", "sorted", "order", "rank", "ranked"},
+    "compare": {"compare", "vs", "versus", "difference"},
+    "negate": {"not", "no", "without", "never", "except"},
+}
+_INTENT_OF = {w: intent for intent, words in _INTENT_WORDS.items() for w in words}
+
+# carry no intent: dropped so rewordings still embed alike
+_FILLER = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "is", "are", "was", "were", "be", "what",
+    "me", "please", "do", "does", "did", "i", "we", "you", "there", "that", "this", "it", "its",
+    "give", "tell", "can", "could", "would", "our",
+}
+
+
+def normalize_question(text: str) -> str:
+    text = (text or "").lower()
+    text = re.sub(r"[^\w\s'\"./-]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def question_literals(text: str) -> Tuple[str, ...]:
+    """Numbers, dates and quoted values: two questions only share SQL if these are identical."""
+    return tuple(sorted(_LITERAL.findall(normalize_question(text))))
+
+
+def question_tokens(text: str) -> List[str]:
+    """
+    Singularized words of the normalized question without filler; intent words are
+    replaced by their intent ("by"/"per"/"each" -> "@group").
+    """
+    tokens = []
+    for word in normalize_question(text).split():
+        word = word.strip("'\"./-")
+        if not word or word in _FILLER:
+            continue
+        if word in _INTENT_OF:
+            tokens.append("@" + _INTENT_OF[word])
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def question_intents(text: str) -> Tuple[str, ...]:
+    """Intent / aggregate classes of a question: two questions only share SQL if these are identical."""
+    return tuple(sorted({t[1:] for t in question_tokens(text) if t.startswith("@")}))
+
+
+def embed_question(text: str, dim: int = SEMANTIC_CACHE_DIM, n: int = SEMANTIC_CACHE_NGRAM) -> np.ndarray:
+    """
+    L2-normalized hashed bag of character n-grams and words over `question_tokens`
+    ("headcount by department" and "what is the headcount per department?" embed identically).
+    """
+    norm = " ".join(question_tokens(text))
+    padded = f" {norm} "
+    features = [padded[i:i + n] for i in range(max(1, len(padded) - n + 1))]
+    features += ["w:" + w for w in norm.split()]
+    idx = np.fromiter((zlib.crc32(f.encode("utf-8")) % dim for f in features), dtype=np.int64, count=len(features))
+    vec = np.bincount(idx, minlength=dim).astype(np.float32)
+    length = np.linalg.norm(vec)
+    return vec / length if length else vec
+
+
+class SemanticCache:
+    """
+    Thread-safe similarity cache. `lookup(question, scope)` returns the best entry with
+    cosine >= threshold (and identical literals and intents), `store(...)` adds/refreshes an entry.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[Tuple[str, str]] = []
+        self._scope: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_scope(self, scope: str) -> None:
+        if scope != self._scope:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+            self._scope = scope
+
+    def _rebuild(self) -> None:
+        self._keys = list(self._entries)
+        if self._keys:
+            self._matrix = np.vstack([self._entries[k]["vector"] for k in self._keys])
+        else:
+            self._matrix = None
+
+    def _expire(self, now: float) -> None:
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+            self.evictions += 1
+        if expired:
+            self._matrix = None
+
+    def lookup(self, question: str, scope: str) -> Optional[Dict[str, Any]]:
+        vector = embed_question(question)
+        literals = question_literals(question)
+        intents = question_intents(question)
+        now = time.time()
+        with self._lock:
+            self._check_scope(scope)
+            self._expire(now)
+            if self._matrix is None:
+                self._rebuild()
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            scores = self._matrix @ vector
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold:
+                    break
+                entry = self._entries[self._keys[i]]
+                if entry["literals"] != literals or entry["intents"] != intents:
+                    continue
+                self._entries.move_to_end(self._keys[i])
+                entry["last_used"] = now
+                entry["hits"] += 1
+                self.hits += 1
+                return {**entry["value"], "similarity": float(scores[i]), "cached_question": entry["question"]}
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, scope: str, value: Dict[str, Any]) -> None:
+        key = (scope, normalize_question(question))
+        now = time.time()
+        with self._lock:
+            self._check_scope(scope)
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                "question": question,
+                "scope": scope,
+                "literals": question_literals(question),
+                "intents": question_intents(question),
+                "vector": embed_question(question),
+                "value": value,
+                "created": now,
+                "last_used": now,
+                "hits": 0,
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate(self, question: str, scope: str) -> None:
+        with self._lock:
+            if self._entries.pop((scope, normalize_question(question)), None) is not None:
+                self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
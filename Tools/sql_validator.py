@@ -0,0 +1,150 @@
+# sql_validator.py
+# Deterministic, local SQL checks that mirror the EvaluationAgent checklist.
+#
+# The statement is prepared with EXPLAIN on a read-only connection (syntax, unknown tables /
+# columns, placeholder count) while an authorizer records every table/column it reads and
+# rejects anything that is not a read. The result has the same JSON shape as the
+# EvaluationAgent output, so the orchestrator can use it in place of an LLM call.
+
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# literals / quoted identifiers / comments, used to inspect the SQL "skeleton" safely
+_MASK_TOKEN = re.compile(
+    r"""('(?:[^']|'')*')|("(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])|(--[^\n]*|/\*.*?\*/)""",
+    re.DOTALL,
+)
+
+# actions a read-only SELECT is allowed to trigger while being prepared
+_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),
+}
+
+# dates must be DD-MM-YYYY or DD/MM/YYYY; flag obvious ISO / year-first literals
+_YEAR_FIRST_DATE = re.compile(r"^\d{4}[-/.]\d{1,2}[-/.]\d{1,2}")
+
+# system/metadata tables the generated SQL may read without them being in table_columns
+_INTERNAL_TABLES = {"sqlite_master", "sqlite_schema", "sqlite_sequence", "sqlite_stat1"}
+
+
+def mask_sql(sql: str) -> Tuple[str, List[str]]:
+    """Replace string literals with '' and drop comments. Returns (skeleton, literals)."""
+    literals: List[str] = []
+
+    def repl(m: re.Match) -> str:
+        literal, ident, comment = m.groups()
+        if literal:
+            literals.append(literal[1:-1].replace("''", "'"))
+            return "''"
+        if ident:
+            return ident
+        return " "
+
+    return _MASK_TOKEN.sub(repl, sql or ""), literals
+
+
+def validate_sql(
+    conn: sqlite3.Connection,
+    sql: str,
+    table_columns: List[Dict[str, Any]],
+    params: Optional[List[Any]] = None,
+    max_rows: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Validate `sql` locally. `table_columns` is the normalized metadata from
+    SchemaGroundingPlugin.get_schema_info; identifiers not listed there are reported.
+
+    Returns {"is_valid", "score", "issues", "feedback_for_builder", "source": "local"}.
+    """
+    issues: List[str] = []
+    skeleton, literals = mask_sql(sql)
+    body = skeleton.strip().rstrip(";").strip()
+    lowered = body.lower()
+
+    # ---- 1. SECURITY: single SELECT statement ----
+    if not body:
+        issues.append("SQL is empty.")
+    elif ";" in body:
+        issues.append("Multiple statements are not allowed; send exactly one SELECT.")
+    first_word = lowered.split(None, 1)[0] if lowered else ""
+    if body and first_word not in ("select", "with"):
+        issues.append(f"Only SELECT queries are allowed (statement starts with '{first_word.upper()}').")
+
+    # ---- 3. PERFORMANCE: LIMIT ----
+    limits = list(re.finditer(r"\blimit\s+(\d+|\?)", lowered))
+    limit: Optional[int] = None
+    if limits and limits[-1].group(1) == "?":
+        # LIMIT ?: check the value bound to that placeholder
+        index = lowered.count("?", 0, limits[-1].start(1))
+        value = list(params or [])[index] if index < len(params or []) else None
+        if isinstance(value, int) and not isinstance(value, bool):
+            limit = value
+        elif isinstance(value, str) and value.strip().isdigit():
+            limit = int(value)
+        else:
+            issues.append("LIMIT ? must be bound to an integer in params.")
+    elif limits:
+        limit = int(limits[-1].group(1))
+    if body and not limits:
+        issues.append("LIMIT clause is missing.")
+    elif limit is not None and max_rows and limit > int(max_rows):
+        issues.append(f"LIMIT {limit} exceeds max_rows ({max_rows}).")
+
+    # ---- 6. DATE FORMAT ----
+    for value in literals + [p for p in (params or []) if isinstance(p, str)]:
+        if _YEAR_FIRST_DATE.match(value.strip()):
+            issues.append(f"Date '{value}' must be DD-MM-YYYY or DD/MM/YYYY.")
+
+    # ---- 5. SYNTAX + schema existence via EXPLAIN ----
+    reads: Set[Tuple[str, str]] = set()
+    denied: List[str] = []
+
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ:
+            reads.add((arg1 or "", arg2 or ""))
+        if action in _ALLOWED_ACTIONS:
+            return sqlite3.SQLITE_OK
+        denied.append(str(action))
+        return sqlite3.SQLITE_DENY
+
+    if body and ";" not in body:
+        placeholders = skeleton.count("?")
+        bind = list(params) if params else [None] * placeholders
+        conn.set_authorizer(authorizer)
+        try:
+            conn.execute(f"EXPLAIN {body}", bind).fetchall()
+        except sqlite3.ProgrammingError as e:
+            issues.append(f"Parameter mismatch: {e}")
+        except sqlite3.DatabaseError as e:
+            if denied:
+                issues.append("Statement performs a non-read operation; only SELECT is allowed.")
+            else:
+                issues.append(f"SQL does not compile: {e}")
+        finally:
+            conn.set_authorizer(None)
+
+    # ---- 2. COVERAGE: identifiers must come from grounded schema ----
+    known = {(c["table_name"].lower(), c["column_name"].lower()) for c in table_columns}
+    known_tables = {t for t, _ in known}
+    if known:
+        for table, column in sorted(reads):
+            t, c = table.lower(), column.lower()
+            if not t or t in _INTERNAL_TABLES:
+                continue
+            if t not in known_tables:
+                issues.append(f"Table '{table}' is not in the grounded schema.")
+            elif c and (t, c) not in known:
+                issues.append(f"Column '{table}.{column}' is not in the grounded schema.")
+
+    issues = list(dict.fromkeys(issues))
+    return {
+        "is_valid": not issues,
+        "score": 1.0 if not issues else max(0.0, 1.0 - 0.25 * len(issues)),
+        "issues": issues,
+        "feedback_for_builder": " ".join(issues) if issues else "",
+        "source": "local",
+    }
@@ -0,0 +1,130 @@
+# table_stats.py
+# Table / column statistics for the tables listed in table_description.
+#
+# Per table: row count. Per column: distinct count, null fraction, min and max.
+# Stats are recomputed incrementally: each table has a cheap fingerprint (row count, max rowid,
+# root page, import manifest content hash) and only tables whose fingerprint moved since the
+# last refresh are re-scanned. The root page changes when a table is dropped and recreated
+# (the importer's staging swap), the manifest hash when the importer loads new content.
+
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# ----- CONFIG -----
+MAX_VALUE_CHARS = 64     # min/max text values are truncated to this length
+# ------------------
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _short(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_VALUE_CHARS:
+        return value[:MAX_VALUE_CHARS] + "..."
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return value
+
+
+def _manifest_hash(conn: sqlite3.Connection, table: str) -> Optional[str]:
+    # content hash(es) recorded by requirements/csv_to_SQLite.py; None without a manifest
+    try:
+        row = conn.execute(
+            "SELECT group_concat(content_hash) FROM "
+            "(SELECT content_hash FROM import_manifest WHERE table_name = ? ORDER BY path)", (table,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def table_fingerprint(conn: sqlite3.Connection, table: str) -> Tuple[Any, ...]:
+    """
+    (row count, max rowid, root page, manifest hash) -- changes on inserts/deletes, on a
+    drop-and-recreate with the same row count and on a re-import with new content.
+    Falls back to NULL max rowid for WITHOUT ROWID tables.
+    """
+    try:
+        count, max_rowid = conn.execute(f"SELECT count(*), max(rowid) FROM {_quote(table)}").fetchone()
+    except sqlite3.OperationalError:
+        count, max_rowid = conn.execute(f"SELECT count(*), NULL FROM {_quote(table)}").fetchone()
+    root = conn.execute("SELECT rootpage FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+    return count, max_rowid, root[0] if root else None, _manifest_hash(conn, table)
+
+
+def collect_table_stats(conn: sqlite3.Connection, table: str) -> Dict[str, Any]:
+    """Scan `table` once and return its row count plus per-column statistics."""
+    columns = [r[1] for r in conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()]
+    exprs = ["count(*)"]
+    for c in columns:
+        q = _quote(c)
+        exprs += [f"count(DISTINCT {q})", f"sum({q} IS NULL)", f"min({q})", f"max({q})"]
+    row = conn.execute(f"SELECT {', '.join(exprs)} FROM {_quote(table)}").fetchone()
+
+    row_count = row[0]
+    col_stats = {}
+    for i, c in enumerate(columns):
+        distinct, nulls, lo, hi = row[1 + 4 * i: 5 + 4 * i]
+        col_stats[c] = {
+            "distinct_count": distinct,
+            "null_fraction": round((nulls or 0) / row_count, 4) if row_count else 0.0,
+            "min": _short(lo),
+            "max": _short(hi),
+        }
+    return {"row_count": row_count, "columns": col_stats}
+
+
+class TableStatistics:
+    """
+    In-process statistics cache. `refresh(conn, tables)` re-scans only tables whose
+    fingerprint changed (or that are new) and drops tables that disappeared.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._fingerprints: Dict[str, Tuple[Any, ...]] = {}
+        self.last_refresh: Optional[float] = None
+
+    def refresh(self, conn: sqlite3.Connection, tables: List[str]) -> List[str]:
+        """Bring stats up to date for `tables`. Returns the names of re-scanned tables."""
+        existing = {
+            r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')").fetchall()
+        }
+        wanted = [t for t in tables if t in existing]
+
+        rescanned = []
+        for table in wanted:
+            fingerprint = table_fingerprint(conn, table)
+            if self._fingerprints.get(table) == fingerprint and table in self._stats:
+                continue
+            self._stats[table] = collect_table_stats(conn, table)
+            self._fingerprints[table] = fingerprint
+            rescanned.append(table)
+
+        for table in list(self._stats):
+            if table not in wanted:
+                del self._stats[table]
+                self._fingerprints.pop(table, None)
+
+        self.last_refresh = time.time()
+        return rescanned
+
+    def row_estimates(self) -> Dict[str, int]:
+        return {t: s["row_count"] for t, s in self._stats.items()}
+
+    def get(self, tables: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        if not tables:
+            return dict(self._stats)
+        return {t: self._stats[t] for t in tables if t in self._stats}
+
+
+def run_analyze(db_path: str) -> None:
+    """Run ANALYZE on a short-lived writable connection (the plugin's pool is read-only)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
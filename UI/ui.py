@@ -1,11 +1,10 @@
 import streamlit as st
 import requests
 import json
-import time
-from typing import Generator
+from typing import Any, Dict, Generator
 
 # -------------------- Configuration --------------------
-API_URL = "http://127.0.0.1:8000/api/chat"
+API_URL = "http://127.0.0.1:8000/api/chat/stream"
 # --------------------------------------------------------
 
 st.set_page_config(page_title="NL2SQL Interface", layout="wide")
@@ -93,7 +92,8 @@ for message in st.session_state.messages:
 # --------------------------------------------------------
 # API CALL
 # --------------------------------------------------------
-def call_nl2sql_api(message: str, user: str) -> str:
+def stream_nl2sql_api(message: str, user: str) -> Generator[Dict[str, Any], None, None]:
+    """POST to the SSE endpoint and yield each event ({"event": "stage" | "token" | "final" | "error", ...})."""
     payload = {
         "message": message,
         "user": user,
@@ -106,19 +106,23 @@ def call_nl2sql_api(message: str, user: str) -> str:
         "max_debug_retries": 3,
     }
 
-    response = requests.post(API_URL, json=payload, timeout=30)
+    # timeout = (connect, read between events); the stream itself may run longer
+    with requests.post(API_URL, json=payload, stream=True, timeout=(5, 120)) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"API Error {response.status_code}: {response.text}")
 
-    if response.status_code != 200:
-        raise RuntimeError(f"API Error {response.status_code}: {response.text}")
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith("data:"):
+                yield json.loads(line[len("data:"):])
 
-    data = response.json()
-    obj = json.loads(data) if isinstance(data, str) else data
-    return obj.get("final_response", "(No response from API)")
-
-def stream_text_generator(text: str):
-    for word in text.split():
-        yield word + " "
-        time.sleep(0.02)
+def final_text(response: Any) -> str:
+    obj = response
+    if isinstance(obj, str):
+        try:
+            obj = json.loads(obj)
+        except ValueError:
+            return obj
+    return obj.get("final_response", "(No response from API)") if isinstance(obj, dict) else str(obj)
 
 # --------------------------------------------------------
 # CHAT INPUT
@@ -136,15 +140,28 @@ if prompt:
         st.markdown(f"**{user_option}:** {prompt}")
 
     try:
-        full_response = call_nl2sql_api(prompt, user_option)
+        full_response = ""
 
         with st.chat_message("assistant"):
+            status = st.empty()
             placeholder = st.empty()
             stream_accum = ""
 
-            for chunk in stream_text_generator(full_response):
-                stream_accum += chunk
-                placeholder.markdown(stream_accum)
+            for event in stream_nl2sql_api(prompt, user_option):
+                kind = event.get("event")
+                if kind == "stage":
+                    status.caption(f"{event.get('stage')} done ({event.get('ms')} ms)")
+                elif kind == "token":
+                    stream_accum += event.get("text", "")
+                    placeholder.markdown(stream_accum)
+                elif kind == "final":
+                    full_response = final_text(event.get("response"))
+                elif kind == "error":
+                    raise RuntimeError(event.get("detail"))
+
+            status.empty()
+            full_response = full_response or stream_accum
+            placeholder.markdown(full_response)
 
         st.session_state.messages.append({
             "role": "assistant",
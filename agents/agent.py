@@ -4,8 +4,12 @@ from semantic_kernel import Kernel
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, AzureChatPromptExecutionSettings
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+from semantic_kernel.filters import FilterTypes
 
 from Tools.Plugin import SchemaGroundingPlugin
+from Tools.semantic_cache import SemanticCache
+from Tools import metrics
+from agents.pipeline import NL2SQLPipeline, stage_event_filter
 from Prompt.Prompt import (
     QUERY_BUILDER_AGENT_PROMPT,
     EVALUATION_AGENT_PROMPT,
@@ -22,47 +26,78 @@ key = os.getenv("incubator_key")
 model = os.getenv("model")
 endpoint = os.getenv("incubator_endpoint")
 
-# Azure chat completion setup
-chat_completion_service = AzureChatCompletion(
-    deployment_name=model,
-    api_key=key,
-    endpoint=endpoint,
-)
+# CHAT_SERVICE=stub replays STUB_SCRIPT_PATH offline (benchmarks/load_chat.py); default is Azure
+chat_service_kind = os.getenv("CHAT_SERVICE", "azure").lower()
+
+
+def create_chat_service(kind: str = chat_service_kind):
+    if kind == "stub":
+        from agents.stub_chat_service import StubChatCompletion
+        latency = os.getenv("STUB_LATENCY_MS")
+        return StubChatCompletion.from_file(
+            os.getenv("STUB_SCRIPT_PATH", "benchmarks/stub_script.json"),
+            latency_ms=float(latency) if latency else None,
+        )
+    if kind != "azure":
+        raise ValueError(f"Unknown CHAT_SERVICE '{kind}', expected 'azure' or 'stub'")
+    return AzureChatCompletion(
+        deployment_name=model,
+        api_key=key,
+        endpoint=endpoint,
+    )
+
+
+# Chat completion setup
+chat_completion_service = create_chat_service()
 
 # Kernel setup
 kernel = Kernel()
 kernel.add_service(chat_completion_service)
 
-# Add plugin
-kernel.add_plugin(SchemaGroundingPlugin(), plugin_name="SchemaGroundingPlugin")
+# Add plugin (kept at module level so the app can warm up / close its connection pool)
+schema_plugin = SchemaGroundingPlugin()
+kernel.add_plugin(schema_plugin, plugin_name="SchemaGroundingPlugin")
+
+# Time every kernel function invocation (covers plugins added later as well)
+kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, metrics.function_invocation_filter)
+# Stage events for streamed orchestrator turns (no-op unless the router set a callback)
+kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, stage_event_filter)
 
 # Optional execution settings (currently unused)
 execution_settings = AzureChatPromptExecutionSettings()
 execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
 
 # Agent definitions
+# Builder/Evaluation/Debug/Explanation are driven by NL2SQLPipeline, which calls the plugin
+# itself; they must not auto-invoke plugin functions (keeps LLM calls per turn fixed).
+no_tool_calls = FunctionChoiceBehavior.NoneInvoke()
+
 Builder_Agent = ChatCompletionAgent(
     kernel=kernel,
     name="BuilderAgent",
     instructions=QUERY_BUILDER_AGENT_PROMPT,
+    function_choice_behavior=no_tool_calls,
 )
 
 Evaluation_Agent = ChatCompletionAgent(
     kernel=kernel,
     name="EvaluationAgent",
     instructions=EVALUATION_AGENT_PROMPT,
+    function_choice_behavior=no_tool_calls,
 )
 
 Debug_Agent = ChatCompletionAgent(
     kernel=kernel,
     name="DebugAgent",
     instructions=DEBUG_AGENT_PROMPT,
+    function_choice_behavior=no_tool_calls,
 )
 
 Explanation_Agent = ChatCompletionAgent(
     kernel=kernel,
     name="ExplanationAgent",
     instructions=EXPLANATION_AGENT_PROMPT,
+    function_choice_behavior=no_tool_calls,
 )
 
 Orchestrator_Agent = ChatCompletionAgent(
@@ -77,4 +112,16 @@ test_agent = ChatCompletionAgent(
     instructions="You are an agent taking inputs from the user. Use the plugin SchemaGroundingPlugin to answer questions about the database schema.",
 )
 
+# Code-driven pipeline, opt-in with mode="pipeline"; Orchestrator_Agent serves the default mode="orchestrator"
+NL2SQL_Pipeline = NL2SQLPipeline(
+    plugin=schema_plugin,
+    builder=Builder_Agent,
+    evaluator=Evaluation_Agent,
+    debugger=Debug_Agent,
+    explainer=Explanation_Agent,
+    semantic_cache=SemanticCache(),
+    kernel=kernel,
+)
 
+metrics.REGISTRY.register_collector(metrics.cache_collector("result", schema_plugin.result_cache.stats))
+metrics.REGISTRY.register_collector(metrics.cache_collector("semantic", NL2SQL_Pipeline.semantic_cache.stats))
@@ -0,0 +1,160 @@
+# history.py
+# Token-budgeted compaction of a ChatHistoryAgentThread before it is sent to an agent.
+#
+# The last `keep_turns` turns (a USER message and everything after it up to the next USER
+# message) are kept verbatim. Older turns are folded into a single summary message that keeps,
+# per turn, the question plus the `last_sql` / `last_result_summary` the assistant reported;
+# function calls and their (often large) SQL results are dropped. If the history is still over
+# `token_budget`, the oldest verbatim turns are folded into the summary as well (always keeping
+# the most recent turn verbatim); only then are the oldest summaries dropped.
+
+import json
+from typing import Any, Dict, List
+
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+from semantic_kernel.contents.function_call_content import FunctionCallContent
+from semantic_kernel.contents.function_result_content import FunctionResultContent
+
+from agents.pipeline import parse_agent_json
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    _ENCODING = None
+    TIKTOKEN_AVAILABLE = False
+
+# ----- CONFIG -----
+HISTORY_KEEP_TURNS = 3          # most recent turns kept verbatim
+HISTORY_TOKEN_BUDGET = 4000     # upper bound for the (estimated) history tokens per request
+SUMMARY_QUESTION_CHARS = 200    # a summarized turn keeps at most this much of the question
+MESSAGE_OVERHEAD_TOKENS = 4     # role / separators per message
+CHARS_PER_TOKEN = 4             # estimate used when tiktoken is not installed
+# ------------------
+
+_SUMMARY_MARKER = "compacted_history"
+_SUMMARY_PREFIX = "Summary of earlier turns (oldest first): "
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _message_text(message: ChatMessageContent) -> str:
+    parts = [message.content or ""]
+    for item in message.items:
+        if isinstance(item, FunctionResultContent):
+            parts.append(str(item.result))
+        elif isinstance(item, FunctionCallContent):
+            parts.append(f"{item.name}({item.arguments})")
+    return "".join(parts)
+
+
+def message_tokens(message: ChatMessageContent) -> int:
+    return estimate_tokens(_message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _is_summary(message: ChatMessageContent) -> bool:
+    # metadata is not kept by ChatHistory.serialize(), so spilled threads are recognized by content
+    return bool(message.metadata.get(_SUMMARY_MARKER)) or (message.content or "").startswith(_SUMMARY_PREFIX)
+
+
+def _summaries(message: ChatMessageContent) -> List[Dict[str, Any]]:
+    if "summaries" in message.metadata:
+        return list(message.metadata["summaries"])
+    try:
+        return list(json.loads(message.content[len(_SUMMARY_PREFIX):]))
+    except ValueError:
+        return []
+
+
+def _split_turns(messages: List[ChatMessageContent]) -> List[List[ChatMessageContent]]:
+    turns: List[List[ChatMessageContent]] = []
+    for m in messages:
+        if m.role == AuthorRole.USER or not turns:
+            turns.append([m])
+        else:
+            turns[-1].append(m)
+    return turns
+
+
+def summarize_turn(turn: List[ChatMessageContent]) -> Dict[str, Any]:
+    """{"question", "last_sql", "last_result_summary"} for one turn (pipeline or orchestrator output)."""
+    question = next((m.content for m in turn if m.role == AuthorRole.USER), "") or ""
+    summary = {"question": question[:SUMMARY_QUESTION_CHARS], "last_sql": "", "last_result_summary": ""}
+    for m in turn:
+        if m.role != AuthorRole.ASSISTANT or not m.content:
+            continue
+        reply = parse_agent_json(m.content)
+        sql = reply.get("last_sql") or (reply.get("sql_debug") or {}).get("final_sql") or ""
+        result = (reply.get("last_result_summary") or (reply.get("explanation") or {}).get("result_summary")
+                  or reply.get("final_response") or "")
+        if sql:
+            summary["last_sql"] = sql
+        if result:
+            summary["last_result_summary"] = str(result)[:SUMMARY_QUESTION_CHARS]
+    return summary
+
+
+def _summary_message(summaries: List[Dict[str, Any]]) -> ChatMessageContent:
+    return ChatMessageContent(
+        role=AuthorRole.ASSISTANT,
+        content=_SUMMARY_PREFIX + json.dumps(summaries),
+        metadata={_SUMMARY_MARKER: True, "summaries": summaries},
+    )
+
+
+def compact_history(
+    chat_history: ChatHistory,
+    keep_turns: int = HISTORY_KEEP_TURNS,
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+) -> Dict[str, Any]:
+    """
+    Compact `chat_history` in place. Returns {"tokens_before", "tokens_after",
+    "summarized_turns", "dropped_turns", "messages"}.
+    """
+    messages = list(chat_history.messages)
+    tokens_before = sum(message_tokens(m) for m in messages)
+    stats = {"tokens_before": tokens_before, "tokens_after": tokens_before, "summarized_turns": 0,
+             "dropped_turns": 0, "messages": len(messages)}
+
+    leading = [m for m in messages if m.role in (AuthorRole.SYSTEM, AuthorRole.DEVELOPER) or _is_summary(m)]
+    leading_ids = {id(m) for m in leading}
+    summaries: List[Dict[str, Any]] = []
+    for m in leading:
+        if _is_summary(m):
+            summaries.extend(_summaries(m))
+    system = [m for m in leading if not _is_summary(m)]
+    turns = _split_turns([m for m in messages if id(m) not in leading_ids])
+
+    keep_turns = max(1, keep_turns)
+    older, recent = turns[:-keep_turns], turns[-keep_turns:]
+    if not older and tokens_before <= token_budget:
+        return stats
+
+    for turn in older:
+        summaries.append(summarize_turn(turn))
+    stats["summarized_turns"] = len(older)
+
+    def total() -> int:
+        summary_tokens = message_tokens(_summary_message(summaries)) if summaries else 0
+        return (sum(message_tokens(m) for m in system) + summary_tokens
+                + sum(message_tokens(m) for t in recent for m in t))
+
+    while total() > token_budget and len(recent) > 1:
+        summaries.append(summarize_turn(recent.pop(0)))
+        stats["summarized_turns"] += 1
+    while total() > token_budget and summaries:
+        summaries.pop(0)
+        stats["dropped_turns"] += 1
+
+    compacted = system + ([_summary_message(summaries)] if summaries else []) + [m for t in recent for m in t]
+    chat_history.messages[:] = compacted
+    stats["tokens_after"] = total()
+    stats["messages"] = len(compacted)
+    return stats
@@ -0,0 +1,533 @@
+# pipeline.py
+# Code-driven NL2SQL pipeline: Schema -> Build -> Validate (-> Evaluate) -> Execute (-> Debug) -> Explain.
+# With a SemanticCache, a confident hit on a previously answered question skips straight to
+# Execute -> Explain. With num_candidates > 1 the Builder is asked for several candidates
+# concurrently and the first one that passes validation is executed (the rest are cancelled).
+# The pipeline (and with it the semantic cache, speculative builds and the result digest) only
+# runs for ChatRequest.mode="pipeline"; the router default is the Orchestrator agent.
+#
+# Every agent and plugin function is invoked directly from Python instead of being left to the
+# Orchestrator LLM, so retry limits are enforced in code, the number of LLM calls per turn is
+# bounded, and every stage is timed. Agents only need an async `get_response(messages, arguments=...)`,
+# which makes each stage testable against stub agents / a stub chat completion service.
+# `run(..., on_event=cb)` reports every stage to `cb` as it finishes and streams the
+# ExplanationAgent's answer_text token by token (used by the /api/chat/stream SSE endpoint).
+# In orchestrator mode the stages are the plugin functions the Orchestrator LLM calls:
+# `stage_event_filter` reports them to the callback set with `stage_events(cb)`.
+
+import asyncio
+import json
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+from semantic_kernel.functions import KernelArguments
+
+from Tools import metrics
+from Tools.result_summary import summarize_result
+
+# ----- CONFIG -----
+EXPLAIN_DIGEST_MAX_CHARS = 4000   # size cap for the result digest shown to the ExplanationAgent
+MAX_CANDIDATES = 5            # upper bound for the speculative Builder fan-out (num_candidates)
+# ------------------
+
+# plugin function -> pipeline stage name, for stage events of orchestrator turns
+FUNCTION_STAGES = {
+    "get_relevant_schema": "schema",
+    "get_schema_info": "schema",
+    "get_table_row_estimates": "statistics",
+    "get_table_statistics": "statistics",
+    "validate_sql": "validate",
+    "execute_sql_script": "execute",
+}
+
+_stage_callback: ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = ContextVar("stage_callback", default=None)
+
+
+def parse_agent_json(text: str) -> Dict[str, Any]:
+    """
+    Extract the JSON object from an agent reply (tolerates ```json fences and chatter
+    around the object). Returns {} when nothing parseable is found.
+    """
+    text = (text or "").strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        value = json.loads(text)
+        return value if isinstance(value, dict) else {}
+    except ValueError:
+        pass
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            value = json.loads(text[start:end + 1])
+            return value if isinstance(value, dict) else {}
+        except ValueError:
+            pass
+    return {}
+
+
+class JSONFieldStream:
+    """
+    Incrementally decode one string field (e.g. "answer_text") out of a JSON object that is
+    still being streamed. `feed(chunk)` returns the newly decoded part of the field's value.
+    """
+
+    def __init__(self, field: str):
+        self._prefix = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._buffer = ""
+        self._start: Optional[int] = None
+        self._emitted = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk or ""
+        if self.done:
+            return ""
+        if self._start is None:
+            m = self._prefix.search(self._buffer)
+            if not m:
+                return ""
+            self._start = m.end()
+
+        raw = self._buffer[self._start:]
+        i, end = 0, len(raw)
+        while i < len(raw):
+            if raw[i] == "\\":
+                step = 6 if raw[i + 1:i + 2] == "u" else 2
+                if i + step > len(raw):
+                    end = i           # escape sequence not complete yet
+                    break
+                i += step
+                continue
+            if raw[i] == '"':
+                end = i
+                self.done = True
+                break
+            i += 1
+
+        try:
+            value = json.loads('"' + raw[:end] + '"')
+        except ValueError:
+            return ""
+        delta, self._emitted = value[self._emitted:], len(value)
+        return delta
+
+
+@contextmanager
+def stage_events(on_event: Optional[Callable[[Dict[str, Any]], None]]) -> Iterator[None]:
+    """Report kernel function calls made inside the block (by the current task) to `on_event`."""
+    token = _stage_callback.set(on_event)
+    try:
+        yield
+    finally:
+        _stage_callback.reset(token)
+
+
+async def stage_event_filter(context, next) -> None:
+    """
+    Semantic Kernel FUNCTION_INVOCATION filter: while `stage_events(cb)` is active, send
+    {"event": "stage", "stage", "function", "ms", "success"} to `cb` after every kernel function.
+    """
+    on_event = _stage_callback.get()
+    if on_event is None:
+        await next(context)
+        return
+    t0 = time.perf_counter()
+    success = False
+    try:
+        await next(context)
+        success = True
+    finally:
+        name = context.function.name
+        on_event({
+            "event": "stage",
+            "stage": FUNCTION_STAGES.get(name, name),
+            "function": f"{context.function.plugin_name}.{name}" if context.function.plugin_name else name,
+            "ms": round((time.perf_counter() - t0) * 1000, 2),
+            "success": success,
+        })
+
+
+class NL2SQLPipeline:
+    """
+    Explicit state machine over the NL2SQL agents.
+
+    `run(args)` takes the same argument dict the chat router builds (user_message, last_sql,
+    db_dialect, max_rows, max_eval_retries, max_debug_retries, ...) and returns a dict in the
+    Orchestrator output shape plus the executed `result`, `llm_calls` and per-stage `timings_ms`.
+
+    Every turn is treated as an NL2SQL question: there is no CHIT_CHAT / FOLLOW_UP classification,
+    and follow-up context comes only from the `last_sql` / `last_result_summary` arguments (the
+    thread is written to, not read), so callers opt in with mode="pipeline".
+
+    `semantic_cache` (Tools/semantic_cache.py) is optional; it is only consulted for
+    standalone questions (no last_sql context) and only stores SQL that executed successfully.
+
+    With `kernel`, plugin kernel functions are invoked through it (as plugin `plugin_name`) so
+    the kernel's function invocation filters (metrics, logging) see them too.
+    """
+
+    def __init__(self, plugin, builder, evaluator, debugger, explainer, semantic_cache=None,
+                 kernel=None, plugin_name: str = "SchemaGroundingPlugin"):
+        self.plugin = plugin
+        self.kernel = kernel
+        self.plugin_name = plugin_name
+        self.builder = builder
+        self.evaluator = evaluator
+        self.debugger = debugger
+        self.explainer = explainer
+        self.semantic_cache = semantic_cache
+        # process-wide counters for speculative builds (num_candidates > 1)
+        self.speculative_stats = {"runs": 0, "wins": 0, "fallbacks": 0, "builder_calls": 0,
+                                  "wasted_calls": 0, "cancelled_calls": 0}
+
+    async def _invoke(self, function_name: str, **kwargs: Any) -> Any:
+        if self.kernel is None:
+            return await getattr(self.plugin, function_name)(**kwargs)
+        # None means "use the function default"; the kernel would try to parse it as the annotated type
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        result = await self.kernel.invoke(plugin_name=self.plugin_name, function_name=function_name, **kwargs)
+        return result.value
+
+    async def _call_agent(self, state: Dict[str, Any], agent, message: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        state["llm_calls"] += 1
+        metrics.LLM_CALLS.inc()
+        status = "error"
+        t0 = time.perf_counter()
+        try:
+            response = await agent.get_response(messages=message, arguments=KernelArguments(**arguments))
+            status = "ok"
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            metrics.LLM_CALL_LATENCY.observe(time.perf_counter() - t0, agent=getattr(agent, "name", ""), status=status)
+        return parse_agent_json(str(response))
+
+    async def _call_agent_stream(self, state: Dict[str, Any], agent, message: str, arguments: Dict[str, Any],
+                                 field: str) -> Dict[str, Any]:
+        """Like _call_agent, but emits the JSON `field` of the reply as "token" events while it streams."""
+        if state["on_event"] is None:
+            return await self._call_agent(state, agent, message, arguments)
+        state["llm_calls"] += 1
+        metrics.LLM_CALLS.inc()
+        extractor, parts = JSONFieldStream(field), []
+        with metrics.LLM_CALL_LATENCY.time(agent=getattr(agent, "name", ""), status="stream"):
+            async for chunk in agent.invoke_stream(messages=message, arguments=KernelArguments(**arguments)):
+                text = str(chunk)
+                parts.append(text)
+                delta = extractor.feed(text)
+                if delta:
+                    state["on_event"]({"event": "token", "text": delta})
+        return parse_agent_json("".join(parts))
+
+    def _log(self, state: Dict[str, Any], stage: str, started: float, **info: Any) -> None:
+        ms = round((time.perf_counter() - started) * 1000, 2)
+        state["timings_ms"][stage] = round(state["timings_ms"].get(stage, 0.0) + ms, 2)
+        state["pipeline_log"].append({"stage": stage, "ms": ms, **info})
+        metrics.STAGE_LATENCY.observe(ms / 1000, stage=stage)
+        if stage not in state["action"]:
+            state["action"].append(stage)
+        if state["on_event"] is not None:
+            state["on_event"]({"event": "stage", "stage": stage, "ms": ms, **info})
+
+    def _needs_semantic_check(self, mode: str, sql: str) -> bool:
+        if mode == "always":
+            return True
+        if mode == "never":
+            return False
+        # "auto": multi-table queries are where the LLM evaluator still adds value
+        return bool(re.search(r"\bjoin\b", sql, re.IGNORECASE))
+
+    # ---- stages ----
+
+    async def _stage_schema(self, state, args) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        schema = await self._invoke("get_relevant_schema", question=args["user_message"])
+        estimates = await self._invoke("get_table_row_estimates")
+        self._log(state, "schema", t0, tables=[t["table_name"] for t in schema["table_description"]])
+        return {"schema_json": json.dumps(schema), "estimates_json": json.dumps(estimates)}
+
+    def _builder_arguments(self, args, ctx) -> Dict[str, Any]:
+        return {
+            "user_query": args["user_message"],
+            "schema_grounding_json": ctx["schema_json"],
+            "last_sql": args.get("last_sql", ""),
+            "db_dialect": args.get("db_dialect", "sqlite"),
+            "max_rows": args.get("max_rows", 1000),
+        }
+
+    async def _stage_build(self, state, args, ctx, feedback: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        message = "Build the SQL query for user_query. Reply with the JSON object only."
+        if feedback:
+            message += f"\nThe previous attempt was rejected. Fix these issues: {feedback}"
+        built = await self._call_agent(state, self.builder, message, self._builder_arguments(args, ctx))
+        self._log(state, "build", t0, sql=built.get("sql", ""))
+        return built
+
+    async def _stage_build_speculative(self, state, args, ctx, n: int):
+        """
+        Ask the Builder for `n` candidates concurrently and validate them as they arrive.
+        The first valid candidate wins and the Builder calls still in flight are cancelled.
+        Returns (built, verdict, feedback); `built` is None when no candidate passed.
+        """
+        t0 = time.perf_counter()
+        if "build" not in state["action"]:
+            state["action"].append("build")   # candidates are validated before the build stage is logged
+        arguments = self._builder_arguments(args, ctx)
+        message = "Build the SQL query for user_query. Reply with the JSON object only."
+        tasks = {
+            asyncio.ensure_future(self._call_agent(
+                state, self.builder,
+                f"{message}\nYou are candidate {i + 1} of {n}; an independent, equally valid formulation is welcome.",
+                arguments,
+            )): i
+            for i in range(n)
+        }
+        pending = set(tasks)
+        built, verdict, winner, issues = None, {}, None, []
+        try:
+            while pending and built is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        candidate = task.result()
+                    except Exception as e:
+                        issues.append(f"Builder call failed: {e}")
+                        continue
+                    sql = (candidate.get("sql") or "").strip()
+                    if not sql:
+                        issues.append("No SQL was returned.")
+                        continue
+                    candidate_verdict = await self._stage_validate(state, args, ctx, sql, candidate.get("params") or [])
+                    if candidate_verdict["is_valid"]:
+                        built, verdict, winner = candidate, candidate_verdict, tasks[task]
+                        break
+                    issues.append(candidate_verdict.get("feedback_for_builder") or "; ".join(candidate_verdict.get("issues", [])))
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        # every call either finished (including the ones done alongside the winner) or was cancelled
+        cancelled = sum(task.cancelled() for task in pending)
+        report = {
+            "candidates": n,
+            "completed": n - cancelled,
+            "cancelled": cancelled,
+            "winner": winner,
+            "wasted_calls": n - 1 if built is not None else n,
+        }
+        state["speculative"] = report
+        stats = self.speculative_stats
+        stats["runs"] += 1
+        stats["wins" if built is not None else "fallbacks"] += 1
+        stats["builder_calls"] += n
+        stats["wasted_calls"] += report["wasted_calls"]
+        stats["cancelled_calls"] += report["cancelled"]
+        self._log(state, "build", t0, sql=(built or {}).get("sql", ""), **report)
+        return built, verdict, " ".join(dict.fromkeys(issues))
+
+    async def _stage_validate(self, state, args, ctx, sql: str, params: List[Any]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        verdict = await self._invoke("validate_sql", sql=sql, params=params, max_rows=args.get("max_rows"))
+        self._log(state, "validate", t0, is_valid=verdict["is_valid"], issues=verdict["issues"])
+
+        if verdict["is_valid"] and self._needs_semantic_check(args.get("semantic_check", "auto"), sql):
+            t0 = time.perf_counter()
+            verdict = await self._call_agent(state, self.evaluator, "Evaluate the SQL. Reply with the JSON object only.", {
+                "user_query": args["user_message"],
+                "sql": sql,
+                "schema_grounding_json": ctx["schema_json"],
+                "db_dialect": args.get("db_dialect", "sqlite"),
+                "table_row_estimates_json": ctx["estimates_json"],
+            })
+            verdict.setdefault("is_valid", True)
+            verdict.setdefault("issues", [])
+            verdict.setdefault("feedback_for_builder", "")
+            self._log(state, "evaluate", t0, is_valid=verdict["is_valid"], issues=verdict["issues"])
+        return verdict
+
+    async def _stage_execute(self, state, args, sql: str, params: List[Any]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        result = await self._invoke(
+            "execute_sql_script",
+            sql=sql,
+            max_rows=args.get("max_rows", 1000),
+            result_format=args.get("result_format", "tuples"),
+            params=params,
+            timeout_ms=args.get("query_timeout_ms", 10000),
+        )
+        self._log(state, "execute", t0, success=result["success"], row_count=result["row_count"],
+                  error=result.get("error"))
+        return result
+
+    async def _stage_debug(self, state, args, ctx, sql: str, error: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        fix = await self._call_agent(state, self.debugger, "Diagnose the failure and fix the SQL. Reply with the JSON object only.", {
+            "sql": sql,
+            "execution_error": error,
+            "schema_grounding_json": ctx["schema_json"],
+            "db_dialect": args.get("db_dialect", "sqlite"),
+            "table_row_estimates_json": ctx["estimates_json"],
+        })
+        self._log(state, "debug", t0, problem_type=fix.get("problem_type"))
+        return fix
+
+    async def _stage_explain(self, state, args, sql: str, result: Dict[str, Any], assumptions: List[str]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        explanation = await self._call_agent_stream(state, self.explainer, "Explain the result. Reply with the JSON object only.", {
+            "user_query": args["user_message"],
+            "final_sql": sql,
+            "result_digest_json": json.dumps(summarize_result(result, max_chars=EXPLAIN_DIGEST_MAX_CHARS), default=str),
+            "row_count": result.get("row_count", 0),
+            "assumptions_json": json.dumps(assumptions),
+            "execution_time_ms": state["timings_ms"].get("execute", 0),
+        }, field="answer_text")
+        self._log(state, "explain", t0)
+        return explanation
+
+    # ---- driver ----
+
+    async def run(
+        self,
+        args: Dict[str, Any],
+        thread: Optional[ChatHistoryAgentThread] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run one NL2SQL turn. `on_event` (optional, synchronous) receives {"event": "stage", ...}
+        after every stage and {"event": "token", "text": ...} for each answer_text delta.
+        """
+        started = time.perf_counter()
+        state: Dict[str, Any] = {"action": [], "pipeline_log": [], "timings_ms": {}, "llm_calls": 0,
+                                 "on_event": on_event}
+        max_eval_retries = int(args.get("max_eval_retries", 3))
+        max_debug_retries = int(args.get("max_debug_retries", 3))
+        num_candidates = max(1, min(int(args.get("num_candidates") or 1), MAX_CANDIDATES))
+
+        # ---- SEMANTIC CACHE: reuse validated SQL for a (near-)identical question ----
+        scope = None
+        if self.semantic_cache is not None and args.get("use_semantic_cache", True) and not args.get("last_sql"):
+            t0 = time.perf_counter()
+            scope = await self.plugin.schema_fingerprint()
+            hit = self.semantic_cache.lookup(args["user_message"], scope)
+            self._log(state, "semantic_cache", t0, hit=hit is not None,
+                      similarity=hit["similarity"] if hit else None)
+            if hit:
+                result = await self._stage_execute(state, args, hit["sql"], hit["params"])
+                if result["success"]:
+                    explanation = await self._stage_explain(state, args, hit["sql"], result, hit["assumptions"])
+                    state["cache_hit"] = hit
+                    return await self._finish(state, args, thread, started, hit["sql"], result, explanation=explanation)
+                # stale entry (e.g. data-dependent failure): drop it and run the full pipeline
+                self.semantic_cache.invalidate(hit["cached_question"], scope)
+
+        ctx = await self._stage_schema(state, args)
+
+        # ---- BUILD <-> VALIDATE, at most 1 + max_eval_retries build rounds ----
+        sql, params, assumptions, feedback, verdict = "", [], [], "", {}
+        attempts = 1 + max_eval_retries
+        if num_candidates > 1:
+            attempts -= 1
+            built, verdict, feedback = await self._stage_build_speculative(state, args, ctx, num_candidates)
+            if built is not None:
+                sql = built["sql"].strip()
+                params = built.get("params") or []
+                assumptions = built.get("assumptions") or []
+        while not verdict.get("is_valid"):
+            if attempts == 0:
+                return await self._finish(state, args, thread, started, sql, None,
+                                          error=f"Could not produce a valid query: {feedback}")
+            attempts -= 1
+            built = await self._stage_build(state, args, ctx, feedback)
+            sql = (built.get("sql") or "").strip()
+            params = built.get("params") or []
+            assumptions = built.get("assumptions") or []
+            if not sql:
+                feedback = "No SQL was returned."
+                continue
+            verdict = await self._stage_validate(state, args, ctx, sql, params)
+            if not verdict["is_valid"]:
+                feedback = verdict.get("feedback_for_builder") or "; ".join(verdict.get("issues", []))
+
+        # ---- EXECUTE <-> DEBUG, at most max_debug_retries fixes ----
+        result = await self._stage_execute(state, args, sql, params)
+        for _ in range(max_debug_retries):
+            if result["success"]:
+                break
+            fix = await self._stage_debug(state, args, ctx, sql, f"[{result.get('error_type', 'SQL_ERROR')}] {result['error']}")
+            replacement = next(
+                (f.get("replacement") for f in fix.get("fix_instructions", []) if f.get("replacement")), None
+            )
+            if not replacement or replacement.strip() == sql:
+                break
+            sql = replacement.strip()
+            if sql.count("?") != len(params):
+                params = []
+            verdict = await self._stage_validate(state, args, ctx, sql, params)
+            if not verdict["is_valid"]:
+                result = {**result, "error": verdict["feedback_for_builder"], "error_type": "VALIDATION"}
+                continue
+            result = await self._stage_execute(state, args, sql, params)
+
+        if not result["success"]:
+            return await self._finish(state, args, thread, started, sql, result, error=result["error"])
+
+        if scope is not None:
+            self.semantic_cache.store(args["user_message"], scope, {"sql": sql, "params": params, "assumptions": assumptions})
+
+        explanation = await self._stage_explain(state, args, sql, result, assumptions)
+        return await self._finish(state, args, thread, started, sql, result, explanation=explanation)
+
+    async def _finish(self, state, args, thread, started, sql, result, explanation=None, error=None) -> Dict[str, Any]:
+        explanation = explanation or {}
+        if error:
+            final_response = f"Sorry, I couldn't answer that from the database. {error}"
+        else:
+            final_response = explanation.get("answer_text") or explanation.get("result_summary") or ""
+
+        state["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 2)
+        stages = [entry["stage"] for entry in state["pipeline_log"]]
+        metrics.RETRIES.inc(max(0, stages.count("build") - 1), kind="eval")
+        metrics.RETRIES.inc(stages.count("debug"), kind="debug")
+        metrics.PIPELINE_RUNS.inc(outcome="error" if error else "semantic_cache" if "cache_hit" in state else "ok")
+        output = {
+            "decision": "NL2SQL",
+            "reason": "code-driven pipeline",
+            "action": state["action"],
+            "pipeline_log": state["pipeline_log"],
+            "final_response": final_response,
+            "sql_debug": {"final_sql": sql, "execution_error": error or ""},
+            "explanation": explanation,
+            "result": result,
+            "llm_calls": state["llm_calls"],
+            "timings_ms": state["timings_ms"],
+            "semantic_cache": {
+                "hit": "cache_hit" in state,
+                "similarity": state["cache_hit"]["similarity"] if "cache_hit" in state else None,
+                "cached_question": state["cache_hit"]["cached_question"] if "cache_hit" in state else None,
+            },
+            "speculative": state.get("speculative"),
+        }
+
+        if thread is not None:
+            # keep the user's conversation in the thread, like the orchestrator path does
+            await thread.on_new_message(ChatMessageContent(role=AuthorRole.USER, content=args["user_message"]))
+            await thread.on_new_message(ChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                content=json.dumps({
+                    "final_response": final_response,
+                    "last_sql": sql,
+                    "last_result_summary": explanation.get("result_summary", ""),
+                }),
+            ))
+        return output
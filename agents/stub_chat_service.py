@@ -0,0 +1,163 @@
+# stub_chat_service.py
+# Offline ChatCompletion service that replays scripted replies (no network, no API key).
+#
+# Used by benchmarks/load_chat.py (and selectable with CHAT_SERVICE=stub) to measure the app
+# without Azure. A script is a JSON file:
+#
+#   {
+#     "latency_ms": 300, "jitter_ms": 50, "stream_chunk_chars": 8,
+#     "rules": [
+#       {"agent": "You are the QUERY BUILDER AGENT", "when": "department", "reply": {"sql": "...", "params": []}},
+#       {"agent": "You are the EXPLANATION AGENT", "reply": {"answer_text": "..."}},
+#       {"agent": "You are the ORCHESTRATOR AGENT", "steps": [
+#           {"tool_calls": [{"function": "SchemaGroundingPlugin-get_relevant_schema", "arguments": {"question": "x"}}]},
+#           {"reply": {"final_response": "..."}}]}
+#     ]
+#   }
+#
+# A rule applies when `agent` occurs in the agent's instructions (system message) and the
+# `when` regex (optional) matches the user question. Replies are JSON-encoded when they are
+# not strings. For `steps`, the step is picked by how many tool-call rounds already happened
+# since the last user message, so tool-calling conversations are replayed turn by turn and
+# the kernel really invokes the plugin functions. Each reply waits latency_ms +- jitter_ms.
+
+import asyncio
+import json
+import random
+import re
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent, StreamingChatMessageContent
+from semantic_kernel.contents.function_call_content import FunctionCallContent
+
+# ----- CONFIG -----
+STUB_DEFAULT_LATENCY_MS = 300
+STUB_DEFAULT_REPLY = {"final_response": "stub reply"}
+# ------------------
+
+_QUESTION = re.compile(r'"user_(?:query|message)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+class StubChatCompletion(ChatCompletionClientBase):
+    """ChatCompletionClientBase that answers from a replay script."""
+
+    SUPPORTS_FUNCTION_CALLING = True
+
+    script: Dict[str, Any] = {}
+    latency_ms: float = STUB_DEFAULT_LATENCY_MS
+    jitter_ms: float = 0.0
+    stream_chunk_chars: int = 8
+    calls: int = 0
+
+    def __init__(self, script: Optional[Dict[str, Any]] = None, service_id: str = "stub", **kwargs: Any):
+        script = script or {}
+        super().__init__(
+            ai_model_id="stub",
+            service_id=service_id,
+            script=script,
+            latency_ms=script.get("latency_ms", STUB_DEFAULT_LATENCY_MS),
+            jitter_ms=script.get("jitter_ms", 0.0),
+            stream_chunk_chars=script.get("stream_chunk_chars", 8),
+            **kwargs,
+        )
+
+    @classmethod
+    def from_file(cls, path: str, **overrides: Any) -> "StubChatCompletion":
+        with open(path, "r", encoding="utf-8") as f:
+            script = json.load(f)
+        script.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(script=script)
+
+    # ---- script matching ----
+
+    @staticmethod
+    def _instructions(chat_history: ChatHistory) -> str:
+        return "\n".join(
+            m.content or "" for m in chat_history.messages if m.role in (AuthorRole.SYSTEM, AuthorRole.DEVELOPER)
+        )
+
+    @staticmethod
+    def _question(chat_history: ChatHistory, instructions: str) -> str:
+        m = _QUESTION.search(instructions)
+        if m and m.group(1):
+            return m.group(1)
+        user = [m for m in chat_history.messages if m.role == AuthorRole.USER]
+        return (user[-1].content or "") if user else ""
+
+    @staticmethod
+    def _tool_rounds(chat_history: ChatHistory) -> int:
+        rounds = 0
+        for m in reversed(chat_history.messages):
+            if m.role == AuthorRole.USER:
+                break
+            if any(isinstance(i, FunctionCallContent) for i in m.items):
+                rounds += 1
+        return rounds
+
+    def _pick(self, chat_history: ChatHistory) -> Dict[str, Any]:
+        instructions = self._instructions(chat_history)
+        question = self._question(chat_history, instructions)
+        for rule in self.script.get("rules", []):
+            if rule.get("agent") and rule["agent"] not in instructions:
+                continue
+            if rule.get("when") and not re.search(rule["when"], question, re.IGNORECASE):
+                continue
+            if "steps" in rule:
+                steps = rule["steps"]
+                return steps[min(self._tool_rounds(chat_history), len(steps) - 1)]
+            return rule
+        return {"reply": STUB_DEFAULT_REPLY}
+
+    async def _wait(self, step: Dict[str, Any]) -> None:
+        latency = step.get("latency_ms", self.latency_ms)
+        jitter = step.get("jitter_ms", self.jitter_ms)
+        delay = max(0.0, latency + random.uniform(-jitter, jitter)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _reply_text(step: Dict[str, Any]) -> str:
+        reply = step.get("reply", "")
+        return reply if isinstance(reply, str) else json.dumps(reply)
+
+    def _tool_calls(self, step: Dict[str, Any]) -> List[FunctionCallContent]:
+        return [
+            FunctionCallContent(
+                id=f"call_{i}",
+                name=call["function"],
+                arguments=json.dumps(call.get("arguments", {})),
+            )
+            for i, call in enumerate(step.get("tool_calls", []))
+        ]
+
+    # ---- ChatCompletionClientBase ----
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings) -> List[ChatMessageContent]:
+        step = self._pick(chat_history)
+        self.calls += 1
+        await self._wait(step)
+        if step.get("tool_calls"):
+            return [ChatMessageContent(role=AuthorRole.ASSISTANT, items=self._tool_calls(step), ai_model_id="stub")]
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=self._reply_text(step), ai_model_id="stub")]
+
+    async def _inner_get_streaming_chat_message_contents(
+        self, chat_history, settings, function_invoke_attempt: int = 0
+    ) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+        step = self._pick(chat_history)
+        self.calls += 1
+        await self._wait(step)
+        if step.get("tool_calls"):
+            yield [StreamingChatMessageContent(
+                role=AuthorRole.ASSISTANT, choice_index=0, items=self._tool_calls(step),
+                function_invoke_attempt=function_invoke_attempt, ai_model_id="stub",
+            )]
+            return
+        text = self._reply_text(step)
+        n = max(1, self.stream_chunk_chars)
+        for i in range(0, len(text), n):
+            yield [StreamingChatMessageContent(
+                role=AuthorRole.ASSISTANT, choice_index=0, content=text[i:i + n],
+                function_invoke_attempt=function_invoke_attempt, ai_model_id="stub",
+            )]
+            await asyncio.sleep(0)
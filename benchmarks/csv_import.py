@@ -0,0 +1,69 @@
+# csv_import.py
+# Compare folder import time of requirements/csv_to_SQLite.py: sequential vs process-pool parsing.
+#
+# Without a folder argument a synthetic one is generated (FILES files x ROWS rows of mixed
+# int / float / text columns). Each mode imports into a fresh SQLite file.
+#
+# Usage (from the repo root):
+#     python -m benchmarks.csv_import [path/to/csv_folder] [workers]
+
+import contextlib
+import csv
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from requirements import csv_to_SQLite as importer
+
+FILES = 8
+ROWS = 200_000
+
+
+def make_folder(folder: Path, files: int = FILES, rows: int = ROWS) -> None:
+    rnd = random.Random(0)
+    for f in range(files):
+        with open(folder / f"table_{f}.csv", "w", newline="", encoding="utf-8") as out:
+            w = csv.writer(out)
+            w.writerow(["Employee ID", "Score", "Rating", "Department", "Notes"])
+            for i in range(rows):
+                w.writerow([i, round(rnd.random() * 100, 3), rnd.randint(1, 5),
+                            rnd.choice(["Sales", "IT/IS", "Admin", "Production"]), f"note {rnd.random():.6f}"])
+
+
+def run(folder: Path, workers: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.sqlite"
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            importer.import_all(folder, db, workers=workers)
+        elapsed = time.perf_counter() - started
+        conn = sqlite3.connect(db)
+        tables = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name NOT IN ('table_description', 'table_columns')"
+        ).fetchone()[0]
+        conn.close()
+    print(f"{'sequential' if workers <= 1 else f'{workers} workers':<14}{elapsed:>10.2f}{tables:>10}")
+    return elapsed
+
+
+def main() -> None:
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] else Path(tmp)
+        if len(sys.argv) <= 1 or not sys.argv[1]:
+            make_folder(folder)
+        n = len(list(folder.glob("*.csv")))
+        print(f"{folder}: {n} CSV files, pandas={'yes' if importer.PANDAS_AVAILABLE else 'no'}\n")
+        print(f"{'mode':<14}{'seconds':>10}{'tables':>10}")
+        sequential = run(folder, 1)
+        parallel = run(folder, workers)
+        print(f"\nspeedup: {sequential / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# load_chat.py
+# Offline end-to-end load benchmark for POST /api/chat.
+#
+# The app runs in-process (httpx ASGITransport) with CHAT_SERVICE=stub, so every agent call is
+# answered by agents/stub_chat_service.py from a replay script with configurable latency, while
+# the plugin, caches, thread store and pipeline run for real against db.sqlite. N simulated
+# users each send M requests concurrently; throughput, latency percentiles and the per-stage
+# breakdown reported by the pipeline are printed and written to a JSON file so runs can be
+# compared between commits.
+#
+# Usage (from the repo root):
+#     python -m benchmarks.load_chat --users 20 --requests 10 [--latency-ms 300] [--mode pipeline]
+#                                    [--script benchmarks/stub_script.json] [--out results.json]
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+
+QUESTIONS = [
+    "What is the headcount by department?",
+    "What is the average engagement score?",
+    "How much did each training program cost?",
+    "How many experienced applicants are in each recruitment status?",
+    "How does engagement vary with employee rating?",
+]
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "mean": round(float(arr.mean()), 2),
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p95": round(float(np.percentile(arr, 95)), 2),
+        "p99": round(float(np.percentile(arr, 99)), 2),
+        "max": round(float(arr.max()), 2),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # the service is chosen when agents.agent is imported, so configure it first
+    os.environ["CHAT_SERVICE"] = "stub"
+    os.environ["STUB_SCRIPT_PATH"] = args.script
+    if args.latency_ms is not None:
+        os.environ["STUB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ.setdefault("THREAD_SPILL_PATH", "")
+
+    import httpx
+    import main
+    from agents.agent import chat_completion_service, schema_plugin
+
+    await schema_plugin.warm_up()
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    llm_calls: List[int] = []
+    errors: List[str] = []
+    cache_hits = 0
+
+    async def user(client: "httpx.AsyncClient", u: int) -> None:
+        nonlocal cache_hits
+        for r in range(args.requests):
+            payload = {
+                "message": QUESTIONS[(u + r) % len(QUESTIONS)],
+                "user": f"bench-user-{u}",
+                "mode": args.mode,
+                "use_semantic_cache": not args.no_semantic_cache,
+                "num_candidates": args.num_candidates,
+            }
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post("/api/chat", json=payload)
+                elapsed = (time.perf_counter() - t0) * 1000
+                if resp.status_code != 200:
+                    errors.append(f"{resp.status_code}: {resp.text[:200]}")
+                    continue
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            latencies.append(elapsed)
+            body = resp.json()
+            if isinstance(body, dict):
+                for stage, ms in body.get("timings_ms", {}).items():
+                    stages[stage].append(ms)
+                llm_calls.append(body.get("llm_calls", 0))
+                cache_hits += bool((body.get("semantic_cache") or {}).get("hit"))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client, u) for u in range(args.users)))
+        wall = time.perf_counter() - started
+
+    total = len(latencies) + len(errors)
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "users": args.users,
+            "requests_per_user": args.requests,
+            "mode": args.mode,
+            "stub_latency_ms": chat_completion_service.latency_ms,
+            "stub_jitter_ms": chat_completion_service.jitter_ms,
+            "script": args.script,
+            "semantic_cache": not args.no_semantic_cache,
+            "num_candidates": args.num_candidates,
+        },
+        "requests": total,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": _percentiles(latencies),
+        "stages_ms": {stage: _percentiles(values) for stage, values in sorted(stages.items())},
+        "llm_calls_per_request": round(float(np.mean(llm_calls)), 2) if llm_calls else None,
+        "stub_llm_calls": chat_completion_service.calls,
+        "semantic_cache_hits": cache_hits,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load benchmark for /api/chat")
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=5, help="requests per user")
+    parser.add_argument("--mode", default="pipeline", choices=["pipeline", "orchestrator"])
+    parser.add_argument("--latency-ms", type=float, default=None, help="override the script's stub latency")
+    parser.add_argument("--script", default="benchmarks/stub_script.json")
+    parser.add_argument("--num-candidates", type=int, default=1)
+    parser.add_argument("--no-semantic-cache", action="store_true")
+    parser.add_argument("--out", default=None, help="JSON output path (default benchmarks/results/load_chat-<commit>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    out = args.out or os.path.join("benchmarks", "results", f"load_chat-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    lat = report["latency_ms"]
+    print(f"{report['requests']} requests, {report['errors']} errors, {report['wall_seconds']} s, "
+          f"{report['throughput_rps']} req/s")
+    print(f"latency ms: p50 {lat.get('p50')}  p95 {lat.get('p95')}  p99 {lat.get('p99')}  max {lat.get('max')}")
+    print(f"{'stage':<16}{'mean':>10}{'p95':>10}")
+    for stage, s in report["stages_ms"].items():
+        print(f"{stage:<16}{s['mean']:>10}{s['p95']:>10}")
+    print(f"written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# result_format.py
+# Measure memory and serialized size of each execute_sql_script result encoding.
+#
+# Usage (from the repo root):
+#     python -m benchmarks.result_format [path/to/db.sqlite] [table]
+
+import json
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+from Tools.result_format import RESULT_FORMATS, ARROW_AVAILABLE, NUMPY_AVAILABLE, encode_rows, to_numpy_columns
+
+
+def measure(db_path: str = "./db.sqlite", table: str = "employee_data") -> None:
+    conn = sqlite3.connect(db_path)
+    cur = conn.execute(f'SELECT * FROM "{table}"')
+    columns = [c[0] for c in cur.description]
+    rows = cur.fetchall()
+    conn.close()
+
+    print(f"{table}: {len(rows)} rows x {len(columns)} columns\n")
+    print(f"{'format':<16}{'python MiB':>12}{'json KiB':>12}{'encode ms':>12}")
+
+    for fmt in RESULT_FORMATS:
+        if fmt == "arrow" and not ARROW_AVAILABLE:
+            print(f"{fmt:<16}{'(pyarrow not installed)':>36}")
+            continue
+
+        encode_rows(columns, rows[:10], fmt)  # warm-up: keep one-off library init out of the numbers
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        encoded = encode_rows(columns, rows, fmt)
+        elapsed = (time.perf_counter() - t0) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        size = len(json.dumps(encoded, default=str).encode("utf-8"))
+        print(f"{fmt:<16}{peak / 2**20:>12.2f}{size / 1024:>12.1f}{elapsed:>12.1f}")
+
+    if NUMPY_AVAILABLE:
+        columnar = encode_rows(columns, rows, "columnar")
+        tracemalloc.start()
+        arrays = to_numpy_columns(columnar)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        numeric = sum(1 for a in arrays.values() if a.dtype != object)
+        print(f"\ncolumnar -> numpy: {peak / 2**20:.2f} MiB peak, {numeric}/{len(arrays)} numeric columns")
+
+
+if __name__ == "__main__":
+    measure(*sys.argv[1:3])
@@ -1,8 +1,38 @@
-from router.nl2sql import router as nl2sql_router
+from router.nl2sql import router as nl2sql_router, thread_store
 from router.heaalth import router as health_router
-from fastapi import FastAPI
+from agents.agent import schema_plugin
+from Tools import metrics
+from fastapi import FastAPI, Request
+import time
 
 
 app = FastAPI()
 app.include_router(nl2sql_router)
-app.include_router(health_router)
\ No newline at end of file
+app.include_router(health_router)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            path=getattr(route, "path", "unmatched"),   # route template keeps label cardinality bounded
+            status=status,
+        )
+
+@app.on_event("startup")
+async def warm_schema_cache() -> None:
+    await schema_plugin.warm_up()
+
+
+@app.on_event("shutdown")
+async def close_db_pool() -> None:
+    schema_plugin.close()
+    thread_store.close()
@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import re
 import csv
+import time
+import queue
+import hashlib
 import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 # Try pandas
 try:
@@ -15,6 +24,35 @@ except Exception:
     PANDAS_AVAILABLE = False
 
 
+# ------------------ CONFIG ------------------
+
+STREAMING_IMPORT = True       # read/insert files in chunks instead of loading them whole
+CHUNK_ROWS = 50_000           # rows per chunk / per insert transaction
+IMPORT_WORKERS = 1            # >1: parse files in a process pool feeding one SQLite writer
+QUEUE_CHUNKS_PER_WORKER = 2   # parsed chunks buffered per worker before workers block
+SNIFF_BYTES = 2048            # bytes read to detect the delimiter
+PROGRESS_SECONDS = 5.0        # min seconds between progress lines
+ENCODINGS = ["utf-8-sig", "utf-8", "latin-1"]
+TYPE_SAMPLE_ROWS = 1000       # rows sampled per file to infer column types (pandas-free path)
+NULL_TOKENS = {"", "na", "n/a", "null", "nan"}   # compared stripped + lowercased
+TRUST_MTIME = True            # same size + mtime as the manifest -> unchanged without hashing
+HASH_BLOCK_BYTES = 1 << 20
+STAGING_SUFFIX = "__staging"  # changed files are loaded into <table>__staging, then swapped in
+DEFER_INDEX_GROWTH = 1.0      # append: drop + rebuild indexes when new bytes >= this share of the old
+OPTIMIZE_AFTER_IMPORT = True  # detect join keys, index them and ANALYZE once files changed
+VACUUM_AFTER_IMPORT = False   # also VACUUM (rewrites the whole file)
+KEY_MIN_ROWS = 2              # a parent key needs at least this many (unique) values
+KEY_MIN_OVERLAP = 0.5         # share of a child column's distinct values found in the parent key
+
+# applied for the duration of a streaming import, restored afterwards
+BULK_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": -200_000,   # KiB
+}
+
+
 # ------------------ UTILITIES ------------------
 
 def sanitize_table_name(name: str) -> str:
@@ -52,8 +90,13 @@ def sniff_delimiter(sample: str) -> str:
         return ","
 
 
+def read_sample(path: Path, n: int = SNIFF_BYTES) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(n)
+
+
 def read_csv_fallback(path: Path):
-    sample = path.read_bytes()[:2048]
+    sample = read_sample(path)
     try:
         sample = sample.decode("utf-8-sig", errors="replace")
     except:
@@ -90,6 +133,102 @@ def read_csv_fallback(path: Path):
     return header, cleaned
 
 
+# ------------------ TYPE INFERENCE ------------------
+# The pandas-free paths pick INTEGER / REAL / BOOLEAN / TEXT per column from the first
+# TYPE_SAMPLE_ROWS rows, then coerce every batch. A later value that does not fit its column
+# type is stored as text (SQLite keeps it as-is) instead of failing the import.
+
+_INT_RE = re.compile(r'^[+-]?(0|[1-9][0-9]{0,17})$')   # fits int64
+_CODE_RE = re.compile(r'^[+-]?(0[0-9]|[0-9]{19,}$)')    # "007", 20-digit ids: codes, kept as text
+_REAL_RE = re.compile(r'^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$')
+_BOOL_VALUES = {"true": 1, "false": 0}
+
+
+def _value_type(value: str) -> str:
+    if value.lower() in _BOOL_VALUES:
+        return "BOOLEAN"
+    if _CODE_RE.match(value):
+        return "TEXT"
+    if _INT_RE.match(value):
+        return "INTEGER"
+    if _REAL_RE.match(value):
+        return "REAL"
+    return "TEXT"
+
+
+def infer_column_types(rows: List[tuple], n_cols: int) -> List[str]:
+    types = []
+    for i in range(n_cols):
+        seen = set()
+        for r in rows:
+            v = r[i].strip()
+            if v.lower() in NULL_TOKENS:
+                continue
+            seen.add(_value_type(v))
+            if "TEXT" in seen:
+                break
+        if seen and seen <= {"INTEGER"}:
+            types.append("INTEGER")
+        elif seen and seen <= {"INTEGER", "REAL"}:
+            types.append("REAL")
+        elif seen == {"BOOLEAN"}:
+            types.append("BOOLEAN")
+        else:
+            types.append("TEXT")
+    return types
+
+
+def _converter(datatype: str):
+    conv = {"INTEGER": int, "REAL": float, "BOOLEAN": lambda v: _BOOL_VALUES[v.lower()]}.get(datatype)
+
+    def convert(value):
+        if value is None:
+            return None
+        v = value.strip()
+        if v.lower() in NULL_TOKENS:
+            return None
+        if conv is None:
+            return value
+        try:
+            return conv(v)
+        except (ValueError, KeyError):
+            return value
+
+    return convert
+
+
+def coerce_rows(rows: List[tuple], types: List[str], nullable: List[bool]) -> List[tuple]:
+    """Convert a batch column by column; sets nullable[i] when column i got a NULL."""
+    if not rows:
+        return rows
+    columns = []
+    for i, col in enumerate(zip(*rows)):
+        convert = _converter(types[i])
+        values = [convert(v) for v in col]
+        if not nullable[i] and None in values:
+            nullable[i] = True
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def _pandas_sqlite_type(dtype) -> str:
+    # same affinities DataFrame.to_sql uses for SQLite
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _pandas_nullable(df, nullable: Optional[List[bool]] = None) -> List[bool]:
+    flags = [bool(x) for x in df.isna().any().tolist()]
+    if nullable is None:
+        return flags
+    return [a or b for a, b in zip(nullable, flags)]
+
+
 # ------------------ SQL HELPERS ------------------
 
 def create_metadata_tables(conn):
@@ -105,14 +244,86 @@ def create_metadata_tables(conn):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS table_columns (
             table_name TEXT,
-            column_name TEXT
+            column_name TEXT,
+            datatype TEXT,
+            ordinal_position INTEGER,
+            is_nullable INTEGER
+        )
+    """)
+
+    # databases created before datatype/ordinal_position/is_nullable existed
+    existing = {r[1] for r in cur.execute("PRAGMA table_info(table_columns)")}
+    added = False
+    for column, ddl in [("datatype", "TEXT"), ("ordinal_position", "INTEGER"), ("is_nullable", "INTEGER")]:
+        if column not in existing:
+            cur.execute(f"ALTER TABLE table_columns ADD COLUMN {column} {ddl}")
+            added = True
+    if added:
+        backfill_column_types(conn)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS table_relationships (
+            from_table TEXT,
+            from_column TEXT,
+            to_table TEXT,
+            to_column TEXT,
+            relationship TEXT,
+            overlap REAL,
+            PRIMARY KEY (from_table, from_column, to_table, to_column)
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS import_manifest (
+            path TEXT PRIMARY KEY,
+            table_name TEXT,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT,
+            imported_at TEXT
         )
     """)
 
     conn.commit()
 
 
-def update_metadata(conn, table_name: str, columns: List[str]):
+def declared_columns(conn, table_name: str) -> Dict[str, Tuple[int, str]]:
+    """column name -> (ordinal position, declared type) from PRAGMA table_info."""
+    return {
+        r[1]: (r[0] + 1, (r[2] or "").upper())
+        for r in conn.execute(f'PRAGMA table_info("{table_name}")')
+    }
+
+
+def backfill_column_types(conn):
+    """Fill datatype / ordinal_position of existing rows from the tables' declared columns."""
+    cur = conn.cursor()
+    tables = [r[0] for r in cur.execute("SELECT DISTINCT table_name FROM table_columns")]
+    for table_name in tables:
+        declared = declared_columns(conn, table_name)
+        cur.executemany(
+            "UPDATE table_columns SET datatype=COALESCE(datatype, ?), ordinal_position=COALESCE(ordinal_position, ?) "
+            "WHERE table_name=? AND column_name=?",
+            [(dtype, pos, table_name, col) for col, (pos, dtype) in declared.items()]
+        )
+
+
+def column_nullability(conn, table_name: str, columns: List[str]) -> List[bool]:
+    """One scan of the table: which columns contain NULLs."""
+    if not columns:
+        return []
+    exprs = ", ".join(f'MAX("{c}" IS NULL)' for c in columns)
+    row = conn.execute(f'SELECT {exprs} FROM "{table_name}"').fetchone()
+    return [bool(v) for v in row]
+
+
+def update_metadata(conn, table_name: str, columns: List[str], nullable: Optional[List[bool]] = None,
+                    commit: bool = True):
+    """
+    Record the table and its columns with the declared datatype, 1-based ordinal position
+    and nullability (scanned from the table when the importer did not track it).
+    commit=False leaves the caller's transaction open.
+    """
     cur = conn.cursor()
 
     cur.execute(
@@ -120,13 +331,22 @@ def update_metadata(conn, table_name: str, columns: List[str]):
         (table_name,)
     )
 
+    declared = declared_columns(conn, table_name)
+    if nullable is None:
+        nullable = column_nullability(conn, table_name, columns)
+
     cur.execute("DELETE FROM table_columns WHERE table_name=?", (table_name,))
     cur.executemany(
-        "INSERT INTO table_columns(table_name, column_name) VALUES (?, ?)",
-        [(table_name, c) for c in columns]
+        "INSERT INTO table_columns(table_name, column_name, datatype, ordinal_position, is_nullable) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (table_name, c, declared.get(c, (i + 1, ""))[1], i + 1, int(n))
+            for i, (c, n) in enumerate(zip(columns, nullable))
+        ]
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
 # ------------------ CSV IMPORT ------------------
@@ -145,16 +365,10 @@ def import_with_pandas(conn, csv_path: Path, table_name: str):
 
     df.columns = [str(c) for c in df.columns]
     df.to_sql(table_name, conn, if_exists="replace", index=False)
-    return list(df.columns)
+    return list(df.columns), _pandas_nullable(df)
 
 
-def import_without_pandas(conn, csv_path: Path, table_name: str):
-    cols, rows = read_csv_fallback(csv_path)
-
-    if not cols:
-        cols = ["col1"]
-
-    # clean col names
+def clean_column_names(cols: List[str]) -> List[str]:
     clean_cols = []
     used = {}
     for c in cols:
@@ -166,50 +380,802 @@ def import_without_pandas(conn, csv_path: Path, table_name: str):
         else:
             used[c2] = 1
         clean_cols.append(c2)
+    return clean_cols
+
+
+def import_without_pandas(conn, csv_path: Path, table_name: str):
+    cols, rows = read_csv_fallback(csv_path)
+
+    if not cols:
+        cols = ["col1"]
+
+    clean_cols = clean_column_names(cols)
+    types = infer_column_types(rows[:TYPE_SAMPLE_ROWS], len(clean_cols))
+    nullable = [False] * len(clean_cols)
 
     cur = conn.cursor()
-    ddl = ", ".join(f'"{c}" TEXT' for c in clean_cols)
+    ddl = ", ".join(f'"{c}" {t}' for c, t in zip(clean_cols, types))
     cur.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({ddl})')
 
     if rows:
         placeholders = ",".join("?" for _ in clean_cols)
         col_list = ",".join(f'"{c}"' for c in clean_cols)
         insert_sql = f'INSERT INTO "{table_name}" ({col_list}) VALUES ({placeholders})'
-        cur.executemany(insert_sql, rows)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            cur.executemany(insert_sql, coerce_rows(rows[start:start + CHUNK_ROWS], types, nullable))
 
     conn.commit()
-    return clean_cols
+    return clean_cols, nullable
 
 
-# ------------------ MAIN IMPORT LOGIC ------------------
+# ------------------ STREAMING IMPORT ------------------
+# Files are read as a generator of CHUNK_ROWS-row chunks and each chunk is inserted in its own
+# transaction, so memory stays flat whatever the file size.
+
+class ImportProgress:
+    """Row counter for one import; prints rows/sec at most every `every` seconds."""
+
+    def __init__(self, label: str, every: Optional[float] = PROGRESS_SECONDS, inline: bool = True):
+        self.label = label
+        self.every = every
+        self.inline = inline   # False: progress on its own lines (parallel import)
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.started = self._last = time.perf_counter()
+
+    def add(self, n: int):
+        self.rows += n
+        now = time.perf_counter()
+        if self.every is not None and now - self._last >= self.every:
+            self._last = now
+            line = f"    {self.label}: {self.rows:,} rows ({self.rate:,.0f} rows/s)"
+            if self.inline:
+                print("\n" + line, end="")
+            else:
+                print(line)
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        seconds = self.seconds
+        return self.rows / seconds if seconds > 0 else 0.0
+
+
+def _set_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any]):
+    for k, v in pragmas.items():
+        conn.execute(f"PRAGMA {k}={v}")
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection, enabled: bool = True):
+    """
+    Apply BULK_PRAGMAS for the duration of the block and restore the previous values.
+    Yields `durable`: a context manager that restores the previous pragmas around a block of
+    commits that must survive a crash (table swaps, manifest updates). With `enabled=False`
+    nothing is changed and `durable` is a no-op.
+    """
+    if not enabled:
+        yield nullcontext
+        return
+
+    conn.commit()
+    previous = {k: conn.execute(f"PRAGMA {k}").fetchone()[0] for k in BULK_PRAGMAS}
+
+    @contextmanager
+    def durable():
+        conn.commit()
+        _set_pragmas(conn, previous)
+        try:
+            yield
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            _set_pragmas(conn, BULK_PRAGMAS)
+
+    _set_pragmas(conn, BULK_PRAGMAS)
+    try:
+        yield durable
+    finally:
+        conn.commit()
+        _set_pragmas(conn, previous)
+
+
+@contextmanager
+def deferred_indexes(conn: sqlite3.Connection, table_name: str):
+    """
+    Drop the table's indexes while rows are loaded into it and build them once at the end
+    (no commit: part of the caller's transaction, whose rollback restores the indexes).
+    """
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+        (table_name,)
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    yield
+    for name, sql in indexes:
+        conn.execute(sql)
+
+
+def _fit_row(r: List[str], cols: int) -> tuple:
+    return tuple(r[:cols]) if len(r) >= cols else tuple(r + [""] * (cols - len(r)))
+
+
+def iter_csv_chunks(path: Path, chunk_rows: int = CHUNK_ROWS,
+                    encoding: str = ENCODINGS[0]) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """
+    Yield (header, rows) with at most `chunk_rows` rows per chunk, normalized to the header
+    length. A file with only a header yields one empty chunk; an empty file yields nothing.
+    """
+    delimiter = sniff_delimiter(read_sample(path).decode(encoding, errors="replace"))
+
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [str(x).strip() for x in header]
+        cols = len(header)
+        rows = (_fit_row(r, cols) for r in reader)
+        first = True
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk and not first:
+                return
+            yield header, chunk
+            first = False
+            if len(chunk) < chunk_rows:
+                return
+
+
+def stream_with_pandas(conn, csv_path: Path, table_name: str, chunk_rows: int,
+                       progress: ImportProgress) -> Tuple[List[str], List[bool]]:
+    for enc in ENCODINGS:
+        progress.reset()
+        cols, nullable = None, None
+        try:
+            for chunk in pd.read_csv(csv_path, encoding=enc, chunksize=chunk_rows):
+                chunk.columns = [str(c) for c in chunk.columns]
+                # to_sql commits once per call -> one transaction per chunk
+                chunk.to_sql(table_name, conn, if_exists="replace" if cols is None else "append", index=False)
+                cols = list(chunk.columns)
+                nullable = _pandas_nullable(chunk, nullable)
+                progress.add(len(chunk))
+        except Exception:
+            cols = None
+        if cols is not None:
+            return cols, nullable
+
+    raise Exception(f"Failed reading using pandas: {csv_path}")
+
+
+def stream_without_pandas(conn, csv_path: Path, table_name: str, chunk_rows: int,
+                          progress: ImportProgress) -> Tuple[List[str], List[bool]]:
+    cur = conn.cursor()
+    clean_cols, types, nullable = None, [], []
+    insert_sql = ""
+
+    for header, rows in iter_csv_chunks(csv_path, chunk_rows):
+        if clean_cols is None:
+            clean_cols = clean_column_names(header or ["col1"])
+            types = infer_column_types(rows[:TYPE_SAMPLE_ROWS], len(clean_cols))
+            nullable = [False] * len(clean_cols)
+            ddl = ", ".join(f'"{c}" {t}' for c, t in zip(clean_cols, types))
+            cur.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({ddl})')
+            placeholders = ",".join("?" for _ in clean_cols)
+            col_list = ",".join(f'"{c}"' for c in clean_cols)
+            insert_sql = f'INSERT INTO "{table_name}" ({col_list}) VALUES ({placeholders})'
+        if rows:
+            cur.executemany(insert_sql, coerce_rows(rows, types, nullable))
+        conn.commit()
+        progress.add(len(rows))
+
+    if clean_cols is None:
+        clean_cols, nullable = ["col1"], [False]
+        cur.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ("col1" TEXT)')
+        conn.commit()
+    return clean_cols, nullable
 
-def import_all(csv_folder: Path, sqlite_path: Path):
+
+def import_streaming(conn, csv_path: Path, table_name: str, chunk_rows: int = CHUNK_ROWS,
+                     progress: Optional[ImportProgress] = None) -> Tuple[List[str], List[bool]]:
+    """
+    Chunked import of one file; returns (columns, nullable flags). A failed import leaves no
+    partial table behind.
+    """
+    progress = progress or ImportProgress(csv_path.name)
+    try:
+        if PANDAS_AVAILABLE:
+            return stream_with_pandas(conn, csv_path, table_name, chunk_rows, progress)
+        return stream_without_pandas(conn, csv_path, table_name, chunk_rows, progress)
+    except Exception:
+        conn.rollback()
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        conn.commit()
+        raise
+
+
+# ------------------ INCREMENTAL IMPORT ------------------
+# import_manifest remembers, per CSV path, the table it was loaded into and the file's size,
+# mtime and SHA-256. On the next import each file is
+#   skip     unchanged: same size + mtime (TRUST_MTIME), or same content hash
+#   append   the file grew and its first <recorded size> bytes still hash to the recorded value:
+#            only the new tail rows are parsed and inserted, in one transaction
+#   replace  anything else: loaded into <table>__staging, then swapped in with one transaction
+#   new      never imported (or its table was dropped)
+# A file without a manifest entry whose table already exists under its sanitized name with the
+# same columns (a database built before the manifest, like the shipped db.sqlite) is adopted:
+# planned as replace into that table instead of becoming <table>_1. So re-running the importer
+# on a refreshed export folder reuses the same table names.
+
+def file_fingerprint(path: Path, prefix_size: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """SHA-256 of the file and, in the same read, of its first `prefix_size` bytes."""
+    h = hashlib.sha256()
+    prefix_hash = None
+    done = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_BYTES)
+            if not block:
+                break
+            if prefix_size is not None and prefix_hash is None and done + len(block) >= prefix_size:
+                cut = prefix_size - done
+                h.update(block[:cut])
+                prefix_hash = h.hexdigest()
+                h.update(block[cut:])
+            else:
+                h.update(block)
+            done += len(block)
+    return h.hexdigest(), prefix_hash
+
+
+def _ends_with_newline(path: Path, size: int) -> bool:
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def csv_header(path: Path) -> List[str]:
+    """First row of `path`, stripped (empty for an empty file)."""
+    for enc in ENCODINGS:
+        try:
+            delimiter = sniff_delimiter(read_sample(path).decode(enc))
+            with open(path, encoding=enc, newline="") as f:
+                return [str(x).strip() for x in next(csv.reader(f, delimiter=delimiter), [])]
+        except UnicodeDecodeError:
+            continue
+    return []
+
+
+def adoptable_table(conn, path: Path, reserved: Set[str]) -> Optional[str]:
+    """Existing table named after `path` with the file's columns (raw or cleaned), if any."""
+    name = sanitize_table_name(path.stem)
+    if name in reserved or conn.execute(
+        "SELECT 1 FROM import_manifest WHERE table_name=?", (name,)
+    ).fetchone():
+        return None
+    existing = [c.lower() for c in declared_columns(conn, name)]
+    header = csv_header(path)
+    if not existing or not header:
+        return None
+    for cols in (header, clean_column_names(header)):
+        if [c.lower() for c in cols] == existing:
+            return name
+    return None
+
+
+def plan_file(conn, path: Path, reserved: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """Decide how to import `path` from its import_manifest entry (see above)."""
+    st = path.stat()
+    plan: Dict[str, Any] = {"path": str(path.resolve()), "size": st.st_size, "mtime": st.st_mtime}
+    reserved = reserved if reserved is not None else set()
+
+    entry = conn.execute(
+        "SELECT table_name, size, mtime, content_hash FROM import_manifest WHERE path=?", (plan["path"],)
+    ).fetchone()
+    exists = entry is not None and conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (entry[0],)
+    ).fetchone() is not None
+
+    if entry is None:
+        adopted = adoptable_table(conn, path, reserved)
+        if adopted:
+            reserved.add(adopted)
+            plan.update(action="replace", table_name=adopted, hash=file_fingerprint(path)[0])
+            return plan
+
+    if not exists:
+        name = entry[0] if entry else unique_table_name(conn, sanitize_table_name(path.stem))
+        while name in reserved:
+            name = unique_table_name(conn, f"{name}_1")
+        reserved.add(name)
+        plan.update(action="new", table_name=name, hash=file_fingerprint(path)[0])
+        return plan
+
+    table_name, size, mtime, content_hash = entry
+    reserved.add(table_name)
+    plan["table_name"] = table_name
+    if TRUST_MTIME and st.st_size == size and st.st_mtime == mtime:
+        plan.update(action="skip", hash=content_hash)
+        return plan
+
+    grew = bool(size) and st.st_size > size
+    full_hash, prefix_hash = file_fingerprint(path, size if grew else None)
+    plan["hash"] = full_hash
+    if full_hash == content_hash:
+        plan["action"] = "skip"
+    elif grew and prefix_hash == content_hash and _ends_with_newline(path, size):
+        plan.update(action="append", offset=size)
+    else:
+        plan["action"] = "replace"
+    return plan
+
+
+def record_manifest(conn, plan: Dict[str, Any]):
+    """Upsert the manifest entry for `plan` (no commit: part of the caller's transaction)."""
+    conn.execute(
+        "INSERT OR REPLACE INTO import_manifest(path, table_name, size, mtime, content_hash, imported_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (plan["path"], plan["table_name"], plan["size"], plan["mtime"], plan["hash"],
+         datetime.now().isoformat(timespec="seconds"))
+    )
+
+
+def append_tail(conn, path: Path, table_name: str, offset: int,
+                chunk_rows: int = CHUNK_ROWS) -> Tuple[int, List[bool]]:
+    """Insert the rows after byte `offset`, coerced to the table's declared types (no commit)."""
+    declared = declared_columns(conn, table_name)
+    cols = list(declared)
+    types = [t if t in ("INTEGER", "REAL", "BOOLEAN") else "TEXT" for _, t in declared.values()]
+    nullable = [False] * len(cols)
+
+    placeholders = ",".join("?" for _ in cols)
+    col_list = ",".join(f'"{c}"' for c in cols)
+    insert_sql = f'INSERT INTO "{table_name}" ({col_list}) VALUES ({placeholders})'
+    delimiter = sniff_delimiter(read_sample(path).decode(ENCODINGS[0], errors="replace"))
+
+    appended = 0
+    with open(path, "rb") as raw:
+        raw.seek(offset)
+        text = io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="")
+        rows = (_fit_row(r, len(cols)) for r in csv.reader(text, delimiter=delimiter) if r)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            conn.executemany(insert_sql, coerce_rows(chunk, types, nullable))
+            appended += len(chunk)
+    return appended, nullable
+
+
+def replace_table(conn, staging: str, table_name: str):
+    """Swap `staging` in as `table_name`, recreating its indexes (no commit)."""
+    index_sql = [r[0] for r in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table_name,)
+    )]
+    conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"')
+    for sql in index_sql:
+        try:
+            conn.execute(sql)
+        except sqlite3.Error:
+            pass
+
+
+def import_target(plan: Dict[str, Any]) -> str:
+    """Table a new/replace plan loads into."""
+    return plan["table_name"] + STAGING_SUFFIX if plan["action"] == "replace" else plan["table_name"]
+
+
+def apply_cheap_plan(conn, plan: Dict[str, Any]) -> str:
+    """Run a skip/append plan; returns the status text."""
+    table_name = plan["table_name"]
+    if plan["action"] == "skip":
+        record_manifest(conn, plan)
+        conn.commit()
+        return f"unchanged → table '{table_name}'"
+
+    # a tail as large as what is already loaded: cheaper to rebuild the indexes than maintain them
+    big_tail = plan["size"] - plan["offset"] >= plan["offset"] * DEFER_INDEX_GROWTH
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        started = time.perf_counter()
+        with deferred_indexes(conn, table_name) if big_tail else nullcontext():
+            appended, nullable = append_tail(conn, Path(plan["path"]), table_name, plan["offset"])
+        previous = dict(conn.execute(
+            "SELECT column_name, is_nullable FROM table_columns WHERE table_name=?", (table_name,)
+        ).fetchall())
+        cols = list(declared_columns(conn, table_name))
+        nullable = [bool(previous.get(c)) or n for c, n in zip(cols, nullable)]
+        update_metadata(conn, table_name, cols, nullable, commit=False)
+        record_manifest(conn, plan)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    rate = appended / (time.perf_counter() - started or 1e-9)
+    return f"OK → appended {appended:,} rows to '{table_name}' ({rate:,.0f} rows/s)"
+
+
+def finish_import(conn, plan: Dict[str, Any], columns: List[str], nullable: Optional[List[bool]]):
+    """Publish a loaded new/replace import: swap, metadata and manifest in one transaction."""
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        if plan["action"] == "replace":
+            replace_table(conn, import_target(plan), plan["table_name"])
+        update_metadata(conn, plan["table_name"], columns, nullable, commit=False)
+        record_manifest(conn, plan)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# ------------------ POST-IMPORT OPTIMIZATION ------------------
+# Join keys are columns whose normalized names match across tables (EmpID == "Employee ID"),
+# that are unique in one table (the parent) and whose distinct values in the other tables are
+# mostly found in the parent (KEY_MIN_OVERLAP). Both sides get an index, the relationships are
+# written to table_relationships (SchemaGroundingPlugin serves them as join hints), then
+# ANALYZE refreshes sqlite_stat1 for the planner.
+
+_KEY_ALIASES = {"emp": "employee", "empid": "employee id", "dept": "department", "no": "number", "num": "number"}
+
+
+def key_name(column: str) -> str:
+    """Normalized column identity: camelCase / snake_case / spaces and common abbreviations."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", column)
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    words = []
+    for raw in re.findall(r"[a-z0-9]+", text.lower()):
+        words += _KEY_ALIASES.get(raw, raw).split()
+    return "_".join(words)
+
+
+def index_name(table_name: str, column: str) -> str:
+    return "idx_" + re.sub(r"\W+", "_", f"{table_name}_{column}").strip("_").lower()
+
+
+def detect_relationships(conn, tables: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Relationships between `tables` ({table: columns}); see the section comment."""
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    for table_name, cols in tables.items():
+        for c in cols:
+            groups.setdefault(key_name(c), []).append((table_name, c))
+
+    relationships = []
+    for refs in groups.values():
+        if len({t for t, _ in refs}) < 2:
+            continue
+        # (non-null values, distinct values) per column
+        profiles = {
+            (t, c): conn.execute(f'SELECT COUNT("{c}"), COUNT(DISTINCT "{c}") FROM "{t}"').fetchone()
+            for t, c in refs
+        }
+        parents = [ref for ref, (n, d) in profiles.items() if n >= KEY_MIN_ROWS and d == n]
+        for parent in parents:
+            for child in refs:
+                if child[0] == parent[0] or (child in parents and child < parent):
+                    continue   # same table, or a one-to-one pair already seen from the other side
+                distinct = profiles[child][1]
+                if not distinct:
+                    continue
+                found = conn.execute(
+                    f'SELECT COUNT(DISTINCT "{child[1]}") FROM "{child[0]}" '
+                    f'WHERE "{child[1]}" IN (SELECT "{parent[1]}" FROM "{parent[0]}")'
+                ).fetchone()[0]
+                if found / distinct < KEY_MIN_OVERLAP:
+                    continue
+                relationships.append({
+                    "from_table": child[0],
+                    "from_column": child[1],
+                    "to_table": parent[0],
+                    "to_column": parent[1],
+                    "relationship": "one_to_one" if child in parents else "many_to_one",
+                    "overlap": round(found / distinct, 3),
+                })
+    return relationships
+
+
+def optimize_database(conn, vacuum: bool = VACUUM_AFTER_IMPORT) -> Dict[str, Any]:
+    """Index detected join keys, record them in table_relationships, ANALYZE (and VACUUM)."""
+    started = time.perf_counter()
+    conn.commit()
+
+    tables: Dict[str, List[str]] = {}
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for table_name, column in conn.execute(
+        "SELECT table_name, column_name FROM table_columns ORDER BY table_name, ordinal_position"
+    ):
+        if table_name in existing:
+            tables.setdefault(table_name, []).append(column)
+
+    relationships = detect_relationships(conn, tables)
+
+    indexes = []
+    keys = {(r["from_table"], r["from_column"]) for r in relationships}
+    keys |= {(r["to_table"], r["to_column"]) for r in relationships}
+    for table_name, column in sorted(keys):
+        name = index_name(table_name, column)
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,)).fetchone():
+            conn.execute(f'CREATE INDEX "{name}" ON "{table_name}" ("{column}")')
+            indexes.append(name)
+
+    conn.execute("DELETE FROM table_relationships")
+    conn.executemany(
+        "INSERT INTO table_relationships(from_table, from_column, to_table, to_column, relationship, overlap) "
+        "VALUES (:from_table, :from_column, :to_table, :to_column, :relationship, :overlap)",
+        relationships
+    )
+    conn.commit()
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    if vacuum:
+        conn.execute("VACUUM")
+
+    for r in relationships:
+        print(f"  join key: {r['from_table']}.{r['from_column']} → {r['to_table']}.{r['to_column']} "
+              f"({r['relationship']}, overlap {r['overlap']:.0%})")
+    print(f"Optimized in {time.perf_counter() - started:.1f}s: {len(relationships)} relationships, "
+          f"{len(indexes)} new indexes, ANALYZE{' + VACUUM' if vacuum else ''}")
+    return {"relationships": relationships, "indexes": indexes}
+
+
+# ------------------ PARALLEL IMPORT ------------------
+# Pool processes parse and type chunks of many files at once and post them on a bounded queue;
+# the main process is the only writer and owns the SQLite connection. Messages are
+# (kind, file_id, payload) with kind "start" (columns, sql types), "chunk" (rows), "done"
+# (row count, nullable flags) or "error" (message). A second "start" for a file means the worker restarted it
+# with another encoding.
+
+_parse_queue = None
+
+
+def _init_parse_worker(q):
+    global _parse_queue
+    _parse_queue = q
+
+
+def _pandas_rows(chunk) -> List[tuple]:
+    # object dtype boxes numpy scalars into Python values sqlite3 can bind; NaN -> NULL
+    return list(chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None))
+
+
+def parse_file_worker(file_id: int, path: str, chunk_rows: int, use_pandas: bool) -> None:
+    q = _parse_queue
+    rows_total = 0
+    nullable = None
+    try:
+        if use_pandas:
+            for enc in ENCODINGS:
+                started = False
+                try:
+                    for chunk in pd.read_csv(path, encoding=enc, chunksize=chunk_rows):
+                        if not started:
+                            cols = [str(c) for c in chunk.columns]
+                            q.put(("start", file_id, (cols, [_pandas_sqlite_type(t) for t in chunk.dtypes])))
+                            started, rows_total, nullable = True, 0, None
+                        nullable = _pandas_nullable(chunk, nullable)
+                        rows = _pandas_rows(chunk)
+                        q.put(("chunk", file_id, rows))
+                        rows_total += len(rows)
+                except Exception:
+                    continue
+                if started:
+                    break
+            else:
+                raise Exception(f"Failed reading using pandas: {path}")
+        else:
+            cols, types = None, []
+            for header, rows in iter_csv_chunks(Path(path), chunk_rows):
+                if cols is None:
+                    cols = clean_column_names(header or ["col1"])
+                    types = infer_column_types(rows[:TYPE_SAMPLE_ROWS], len(cols))
+                    nullable = [False] * len(cols)
+                    q.put(("start", file_id, (cols, types)))
+                q.put(("chunk", file_id, coerce_rows(rows, types, nullable)))
+                rows_total += len(rows)
+            if cols is None:
+                nullable = [False]
+                q.put(("start", file_id, (["col1"], ["TEXT"])))
+        q.put(("done", file_id, (rows_total, nullable)))
+    except Exception as e:
+        q.put(("error", file_id, str(e)))
+
+
+def import_all_parallel(csv_folder: Path, sqlite_path: Path, workers: int = IMPORT_WORKERS,
+                        chunk_rows: int = CHUNK_ROWS, optimize: bool = OPTIMIZE_AFTER_IMPORT,
+                        vacuum: bool = VACUUM_AFTER_IMPORT):
 
     conn = sqlite3.connect(sqlite_path)
     create_metadata_tables(conn)
 
     csv_files = sorted(csv_folder.glob("*.csv"))
-    print(f"\nFound {len(csv_files)} CSV files.\n")
+    print(f"\nFound {len(csv_files)} CSV files ({workers} parser processes).\n")
 
-    for i, file in enumerate(csv_files, start=1):
-        print(f"[{i}/{len(csv_files)}] Importing {file.name} ... ", end="")
+    columns: Dict[int, List[str]] = {}
+    progress: Dict[int, ImportProgress] = {}
+    total = ImportProgress("all files", inline=False)
+    pending = set(range(len(csv_files)))
+    finished = 0
+    changed = 0
 
-        base = sanitize_table_name(file.stem)
-        table_name = unique_table_name(conn, base)
+    def report(i: int, status: str):
+        nonlocal finished
+        finished += 1
+        pending.discard(i)
+        print(f"[{finished}/{len(csv_files)}] Importing {csv_files[i].name} ... {status}")
 
+    def drop(i: int):
+        conn.rollback()
+        conn.execute(f'DROP TABLE IF EXISTS "{table_names[i]}"')
+        conn.commit()
+
+    # plans are made up front, in file order, so table names match the sequential import;
+    # unchanged and appended files never reach the pool
+    plans: Dict[int, Dict[str, Any]] = {}
+    table_names: Dict[int, str] = {}
+    reserved: Set[str] = set()
+    for i, file in enumerate(csv_files):
         try:
-            if PANDAS_AVAILABLE:
-                cols = import_with_pandas(conn, file, table_name)
+            plans[i] = plan = plan_file(conn, file, reserved)
+            if plan["action"] in ("skip", "append"):
+                report(i, apply_cheap_plan(conn, plan))
+                changed += plan["action"] == "append"
             else:
-                cols = import_without_pandas(conn, file, table_name)
+                table_names[i] = import_target(plan)
+        except Exception as e:
+            report(i, f"FAILED ({e})")
 
-            update_metadata(conn, table_name, cols)
-            print(f"OK → table '{table_name}'")
+    ctx = multiprocessing.get_context()
+    q = ctx.Queue(maxsize=max(2, workers * QUEUE_CHUNKS_PER_WORKER))
 
-        except Exception as e:
-            print(f"FAILED ({e})")
+    with bulk_load(conn) as durable, ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_parse_worker, initargs=(q,)
+    ) as pool:
+        futures = [
+            pool.submit(parse_file_worker, i, str(csv_files[i]), chunk_rows, PANDAS_AVAILABLE)
+            for i in sorted(table_names)
+        ]
+
+        while pending:
+            try:
+                kind, i, payload = q.get(timeout=0.5)
+            except queue.Empty:
+                # a crashed pool process never posts "done"/"error" for its file
+                if all(f.done() for f in futures) and any(f.exception() for f in futures):
+                    for i in sorted(pending):
+                        drop(i)
+                        report(i, "FAILED (parser process exited)")
+                continue
+
+            if i not in pending:
+                continue
+            table_name = table_names[i]
+            try:
+                if kind == "start":
+                    cols, types = payload
+                    drop(i)
+                    ddl = ", ".join(f'"{c}" {t}' for c, t in zip(cols, types))
+                    conn.execute(f'CREATE TABLE "{table_name}" ({ddl})')
+                    conn.commit()
+                    columns[i] = cols
+                    progress[i] = ImportProgress(csv_files[i].name, every=None)
+                elif kind == "chunk":
+                    if payload:
+                        placeholders = ",".join("?" for _ in columns[i])
+                        col_list = ",".join(f'"{c}"' for c in columns[i])
+                        conn.executemany(f'INSERT INTO "{table_name}" ({col_list}) VALUES ({placeholders})', payload)
+                    conn.commit()
+                    progress[i].add(len(payload))
+                    total.add(len(payload))
+                elif kind == "done":
+                    _, nullable = payload
+                    with durable():
+                        finish_import(conn, plans[i], columns[i], nullable)
+                    changed += 1
+                    p = progress[i]
+                    verb = "replaced" if plans[i]["action"] == "replace" else "table"
+                    report(i, f"OK → {verb} '{plans[i]['table_name']}' ({p.rows:,} rows, {p.rate:,.0f} rows/s)")
+                else:
+                    drop(i)
+                    report(i, f"FAILED ({payload})")
+            except Exception as e:
+                # keep draining: the worker may still post chunks for this file
+                drop(i)
+                report(i, f"FAILED ({e})")
+
+        # unblock workers still posting chunks of files that already failed
+        while not all(f.done() for f in futures):
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    elapsed, rate = total.seconds, total.rate
+    if optimize and changed:
+        print()
+        optimize_database(conn, vacuum)
+    conn.close()
+    if elapsed > 0:
+        print(f"\nImported {total.rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+    print("\nAll done!\n")
+
+
+# ------------------ MAIN IMPORT LOGIC ------------------
+
+def import_all(csv_folder: Path, sqlite_path: Path, streaming: bool = STREAMING_IMPORT,
+               chunk_rows: int = CHUNK_ROWS, workers: int = IMPORT_WORKERS,
+               optimize: bool = OPTIMIZE_AFTER_IMPORT, vacuum: bool = VACUUM_AFTER_IMPORT):
+
+    if workers > 1:
+        return import_all_parallel(csv_folder, sqlite_path, workers, chunk_rows, optimize, vacuum)
+
+    conn = sqlite3.connect(sqlite_path)
+    create_metadata_tables(conn)
+
+    csv_files = sorted(csv_folder.glob("*.csv"))
+    print(f"\nFound {len(csv_files)} CSV files.\n")
+
+    started = time.perf_counter()
+    total_rows = 0
+    changed = 0
+    reserved: Set[str] = set()
+
+    with bulk_load(conn, enabled=streaming) as durable:
+        for i, file in enumerate(csv_files, start=1):
+            print(f"[{i}/{len(csv_files)}] Importing {file.name} ... ", end="")
+
+            target = None
+            try:
+                plan = plan_file(conn, file, reserved)
+                if plan["action"] in ("skip", "append"):
+                    with durable():
+                        print(apply_cheap_plan(conn, plan))
+                    changed += plan["action"] == "append"
+                    continue
+
+                target = import_target(plan)
+                conn.execute(f'DROP TABLE IF EXISTS "{target}"')
+                if streaming:
+                    progress = ImportProgress(file.name)
+                    cols, nullable = import_streaming(conn, file, target, chunk_rows, progress)
+                    total_rows += progress.rows
+                    rate = f" ({progress.rows:,} rows, {progress.rate:,.0f} rows/s)"
+                elif PANDAS_AVAILABLE:
+                    cols, nullable = import_with_pandas(conn, file, target)
+                    rate = ""
+                else:
+                    cols, nullable = import_without_pandas(conn, file, target)
+                    rate = ""
+
+                with durable():
+                    finish_import(conn, plan, cols, nullable)
+                changed += 1
+                verb = "replaced" if plan["action"] == "replace" else "table"
+                print(f"OK → {verb} '{plan['table_name']}'{rate}")
+
+            except Exception as e:
+                if target and target.endswith(STAGING_SUFFIX):
+                    conn.rollback()
+                    conn.execute(f'DROP TABLE IF EXISTS "{target}"')
+                    conn.commit()
+                print(f"FAILED ({e})")
 
+    elapsed = time.perf_counter() - started
+    if optimize and changed:
+        print()
+        optimize_database(conn, vacuum)
     conn.close()
+    if streaming and elapsed > 0:
+        print(f"\nImported {total_rows:,} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
     print("\nAll done!\n")
 
 
@@ -220,6 +1186,8 @@ def main():
 
     csv_folder_input = input("Enter CSV folder path: ").strip()
     sqlite_input = input("Enter SQLite DB path (file or folder): ").strip()
+    workers_input = input(f"Parser processes (Enter for {IMPORT_WORKERS}): ").strip()
+    vacuum_input = input("VACUUM after import? [y/N]: ").strip().lower()
 
     csv_folder = Path(csv_folder_input).expanduser().resolve()
     sqlite_path = Path(sqlite_input).expanduser().resolve()
@@ -235,7 +1203,8 @@ def main():
     sqlite_path.parent.mkdir(parents=True, exist_ok=True)
 
     print(f"\nUsing SQLite DB: {sqlite_path}\n")
-    import_all(csv_folder, sqlite_path)
+    workers = int(workers_input) if workers_input.isdigit() else IMPORT_WORKERS
+    import_all(csv_folder, sqlite_path, workers=workers, vacuum=vacuum_input in ("y", "yes"))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,35 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from Tools.metrics import REGISTRY
+from agents.agent import schema_plugin
 
 router = APIRouter(prefix="/api")
 
 @router.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    # Prometheus text exposition format
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/index-advice")
+async def index_advice() -> dict:
+    # proposals from the executed-query workload plus the before/after report of applied ones
+    advisor = schema_plugin.index_advisor
+    return {
+        "proposals": await schema_plugin.index_advice(),
+        "applied": schema_plugin.index_reports,
+        "queries_recorded": advisor.queries_recorded,
+        "queries_dropped": advisor.queries_dropped,
+    }
+
+
+@router.post("/index-advice/apply")
+async def apply_index_advice(measure: bool = True) -> dict:
+    # create the current proposals (needs a writable db file); returns the measured report
+    return {"applied": await schema_plugin.apply_index_advice(measure=measure)}
@@ -1,6 +1,15 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from schemas.chatrequest import ChatRequest
-from agents.agent import Orchestrator_Agent,thread
+from agents.agent import Orchestrator_Agent, NL2SQL_Pipeline, schema_plugin
+from agents.pipeline import JSONFieldStream, stage_events
+from agents.history import HISTORY_KEEP_TURNS, HISTORY_TOKEN_BUDGET, compact_history
+from router.thread_store import ThreadStore
+from router.singleflight import KeyedLocks, SingleFlight, request_key
+from Tools import metrics
 from fastapi import HTTPException
 from semantic_kernel.functions import KernelArguments
 from semantic_kernel.agents import ChatHistoryAgentThread
@@ -8,17 +17,43 @@ from semantic_kernel.agents import ChatHistoryAgentThread
 
 router = APIRouter(prefix="/api")
 
-threads = {}
+thread_store = ThreadStore()
+thread_locks = KeyedLocks()      # one turn at a time per user thread
+single_flight = SingleFlight()   # identical in-flight requests share one run
 
-def get_thread(thread_id: str) -> ChatHistoryAgentThread:
-    # return existing thread or create a new one
-    if thread_id not in threads:
-        threads[thread_id] = ChatHistoryAgentThread(thread_id=thread_id)
-    return threads[thread_id]
 
+def _router_samples():
+    stats = thread_store.stats()
+    yield "nl2sql_live_threads", "gauge", "Conversation threads held in memory.", {}, stats["live_threads"]
+    yield "nl2sql_live_thread_bytes", "gauge", "Estimated bytes of live thread histories.", {}, stats["live_bytes"]
+    for reason in ("ttl", "capacity", "memory"):
+        yield ("nl2sql_evicted_threads_total", "counter", "Threads evicted from memory.",
+               {"reason": reason}, stats[f"evicted_{reason}"])
+    flights = single_flight.stats()
+    yield "nl2sql_single_flight_shared_total", "counter", "Requests served by an identical in-flight run.", {}, flights["shared"]
 
-@router.post("/chat")
-async def chat_endpoint(req: ChatRequest):
+
+metrics.REGISTRY.register_collector(_router_samples)
+
+async def get_thread(thread_id: str) -> ChatHistoryAgentThread:
+    # return the live thread, rehydrate a spilled one or create a new one
+    return await thread_store.get(thread_id)
+
+
+def compact_thread(thread: ChatHistoryAgentThread, req: ChatRequest) -> dict:
+    # keep the prompt under the token budget before the thread is sent to an agent
+    return compact_history(
+        thread._chat_history,
+        keep_turns=req.history_keep_turns or HISTORY_KEEP_TURNS,
+        token_budget=req.history_token_budget or HISTORY_TOKEN_BUDGET,
+    )
+
+
+async def build_arguments(req: ChatRequest) -> Dict[str, Any]:
+    try:
+        row_estimates = await schema_plugin.get_table_row_estimates()
+    except Exception:
+        row_estimates = {}
 
     arguments = {
         "user_message": req.message,
@@ -27,17 +62,130 @@ async def chat_endpoint(req: ChatRequest):
         "last_result_summary": req.last_result_summary or "",
         "db_dialect": req.db_dialect or "sqlite",
         "max_rows": req.max_rows or 1000,
+        "query_timeout_ms": req.query_timeout_ms or 10000,
         "max_eval_retries": req.max_eval_retries or 3,
         "max_debug_retries": req.max_debug_retries or 3,
+        "result_format": req.result_format or "tuples",
+        "table_row_estimates_json": json.dumps(row_estimates),
+        "semantic_check": req.semantic_check or "auto",
+        "use_semantic_cache": req.use_semantic_cache is not False,
+        "num_candidates": req.num_candidates or 1,
     }
+    return arguments
+
+
+async def run_turn(req: ChatRequest, arguments: Dict[str, Any], on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """
+    One chat turn on the user's thread. Turns for the same user are serialized; `on_event`
+    receives stage / token events when the caller streams.
+    """
+    async with thread_locks.hold(req.user):
+        thread = await get_thread(req.user)
+        try:
+            history = compact_thread(thread, req)
+            if on_event is not None:
+                on_event({"event": "history", **history})
+
+            # the pipeline always builds SQL and takes last_sql only from the request; CHIT_CHAT /
+            # FOLLOW_UP classification and thread context stay with the orchestrator (the default)
+            if (req.mode or "orchestrator") == "pipeline":
+                output = await NL2SQL_Pipeline.run(arguments, thread=thread, on_event=on_event)
+                return {**output, "history": history}
+
+            if on_event is None:
+                with metrics.LLM_CALL_LATENCY.time(agent=Orchestrator_Agent.name, status="ok"):
+                    response = await Orchestrator_Agent.get_response(
+                        messages=req.message,
+                        thread=thread,
+                        arguments=KernelArguments(**arguments),
+                    )
+                return str(response)
+
+            extractor, parts = JSONFieldStream("final_response"), []
+            with stage_events(on_event):   # plugin calls the orchestrator makes -> "stage" events
+                async for chunk in Orchestrator_Agent.invoke_stream(
+                    messages=req.message,
+                    thread=thread,
+                    arguments=KernelArguments(**arguments),
+                ):
+                    parts.append(str(chunk))
+                    delta = extractor.feed(str(chunk))
+                    if delta:
+                        on_event({"event": "token", "text": delta})
+            return "".join(parts)
+        finally:
+            thread_store.release(thread)
+
+
+@router.post("/chat")
+async def chat_endpoint(req: ChatRequest):
+
+    arguments = await build_arguments(req)
 
     try:
-        response = await Orchestrator_Agent.get_response(
-            messages=req.message,
-            thread=get_thread(req.user),
-            arguments=KernelArguments(**arguments),
-        )
-        return str(response)
+        return await single_flight.do(request_key(req.model_dump()), lambda: run_turn(req, arguments))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent error: {e}")
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """
+    Server-Sent Events version of /chat. Events:
+      history -- how the conversation history was compacted (tokens before/after)
+      stage   -- a stage finished, with its timing: a pipeline stage (schema, build, validate,
+                 execute, ...) or, in orchestrator mode, a plugin function the orchestrator
+                 called (schema, validate, execute, ... plus the function name)
+      token   -- next piece of the answer text
+      shared  -- an identical request is already running; only its final result will follow
+      final   -- the complete /chat response
+      error   -- the turn failed
+    """
+    arguments = await build_arguments(req)
+    queue: asyncio.Queue = asyncio.Queue()
+    key = request_key(req.model_dump())
+
+    async def produce() -> None:
+        try:
+            if single_flight.in_flight(key):
+                queue.put_nowait({"event": "shared"})
+            output = await single_flight.do(key, lambda: run_turn(req, arguments, on_event=queue.put_nowait))
+            queue.put_nowait({"event": "final", "response": output})
+        except Exception as e:
+            queue.put_nowait({"event": "error", "detail": f"Agent error: {e}"})
+        finally:
+            queue.put_nowait(None)
+
+    async def events() -> AsyncIterator[str]:
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield _sse(event)
+        finally:
+            # client went away before the turn finished: stop waiting (the shared run is
+            # cancelled once no other request is waiting on it)
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/threads/stats")
+async def thread_stats() -> dict:
+    return {
+        **thread_store.stats(),
+        "locked_threads": len(thread_locks),
+        "single_flight": single_flight.stats(),
+    }
@@ -0,0 +1,82 @@
+# singleflight.py
+# Request coordination for the chat router.
+#
+# KeyedLocks: one asyncio.Lock per key (the user's thread id) so turns on the same
+#   ChatHistoryAgentThread are applied one at a time, in arrival order. Locks are created on
+#   demand and dropped when nobody holds or waits for them.
+# SingleFlight: identical requests that arrive while the first one is still running share its
+#   execution and result instead of starting another pipeline. The shared run is cancelled only
+#   when every caller waiting on it has gone away.
+
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+
+class KeyedLocks:
+    def __init__(self):
+        self._locks: Dict[str, Dict[str, Any]] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        entry = self._locks.setdefault(key, {"lock": asyncio.Lock(), "users": 0})
+        entry["users"] += 1
+        try:
+            async with entry["lock"]:
+                yield
+        finally:
+            entry["users"] -= 1
+            if entry["users"] == 0:
+                self._locks.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Stable key for a request body (same user, message and options -> same key)."""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn()` for `key`, or wait for the run already in flight for `key`."""
+        call = self._calls.get(key)
+        if call is None:
+            call = {"task": asyncio.ensure_future(fn()), "waiters": 0}
+            self._calls[key] = call
+            call["task"].add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.shared += 1
+
+        call["waiters"] += 1
+        try:
+            return await asyncio.shield(call["task"])
+        finally:
+            call["waiters"] -= 1
+            if call["waiters"] == 0 and not call["task"].done():
+                call["task"].cancel()
+
+    def _forget(self, key: str, call: Dict[str, Any]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.executions + self.shared
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "shared": self.shared,
+            "shared_ratio": (self.shared / total) if total else 0.0,
+        }
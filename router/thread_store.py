@@ -0,0 +1,227 @@
+# thread_store.py
+# Bounded store for the per-user ChatHistoryAgentThreads used by the chat router.
+#
+# Threads live in an LRU ordered by last use. A thread is evicted when it has been idle longer
+# than the TTL, or when the store exceeds its thread-count / memory budget (oldest first).
+# Memory is an estimate: message text plus a fixed per-message overhead, re-measured after
+# every turn. Evicted threads are optionally spilled to a local SQLite file and rehydrated
+# the next time the same user sends a request. Spill-file I/O runs on one dedicated worker
+# thread, in submission order, so it never blocks the event loop and a rehydrate always sees
+# the spills queued before it.
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.contents import ChatHistory
+
+# ----- CONFIG -----
+THREAD_STORE_MAX_THREADS = 1000
+THREAD_STORE_MAX_BYTES = 64 * 1024 * 1024        # estimated history bytes across all live threads
+THREAD_STORE_IDLE_TTL_SECONDS = 30 * 60
+THREAD_SPILL_PATH = os.getenv("THREAD_SPILL_PATH", "thread_spill.sqlite")   # "" disables spilling
+THREAD_SPILL_TTL_SECONDS = 7 * 24 * 3600         # spilled threads older than this are dropped
+MESSAGE_OVERHEAD_BYTES = 256                     # per-message object overhead in the estimate
+# ------------------
+
+
+def estimate_thread_bytes(thread: ChatHistoryAgentThread) -> int:
+    messages = thread._chat_history.messages if thread._chat_history is not None else []
+    return sum(len(str(m.content or "")) + MESSAGE_OVERHEAD_BYTES for m in messages)
+
+
+class ThreadStore:
+    """
+    `await get(thread_id)` returns the live thread (rehydrated from the spill file or newly
+    created when needed); `release(thread)` must be called when a turn is done so the thread
+    is re-measured and the budgets are enforced. Spills triggered by either are queued, not
+    waited for.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = THREAD_STORE_MAX_THREADS,
+        max_bytes: int = THREAD_STORE_MAX_BYTES,
+        idle_ttl_seconds: float = THREAD_STORE_IDLE_TTL_SECONDS,
+        spill_path: Optional[str] = THREAD_SPILL_PATH,
+    ):
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._threads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = {
+            "created": 0,
+            "hits": 0,
+            "rehydrated": 0,
+            "evicted_ttl": 0,
+            "evicted_capacity": 0,
+            "evicted_memory": 0,
+            "spilled": 0,
+            "spill_errors": 0,
+        }
+
+        self._spill: Optional[sqlite3.Connection] = None
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._spilled_threads: Optional[int] = None
+        if spill_path:
+            self._spill = sqlite3.connect(spill_path, check_same_thread=False)
+            self._spill.execute(
+                "CREATE TABLE IF NOT EXISTS spilled_threads ("
+                "thread_id TEXT PRIMARY KEY, history TEXT NOT NULL, spilled_at REAL NOT NULL)"
+            )
+            self._spill.execute(
+                "DELETE FROM spilled_threads WHERE spilled_at < ?", (time.time() - THREAD_SPILL_TTL_SECONDS,)
+            )
+            self._spill.commit()
+            self._count_spilled()
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thread-spill")
+
+    # ---- spill file (only touched from the self._io worker) ----
+
+    def _count_spilled(self) -> None:
+        self._spilled_threads = self._spill.execute("SELECT count(*) FROM spilled_threads").fetchone()[0]
+
+    def _write_spill(self, thread_id: str, thread: ChatHistoryAgentThread) -> None:
+        try:
+            self._spill.execute(
+                "INSERT OR REPLACE INTO spilled_threads (thread_id, history, spilled_at) VALUES (?, ?, ?)",
+                (thread_id, thread._chat_history.serialize(), time.time()),
+            )
+            self._spill.commit()
+            self._count_spilled()
+            self.metrics["spilled"] += 1
+        except (sqlite3.Error, ValueError):
+            self.metrics["spill_errors"] += 1
+
+    def _delete_spill(self, thread_id: str) -> None:
+        try:
+            self._spill.execute("DELETE FROM spilled_threads WHERE thread_id = ?", (thread_id,))
+            self._spill.commit()
+            self._count_spilled()
+        except sqlite3.Error:
+            self.metrics["spill_errors"] += 1
+
+    def _rehydrate(self, thread_id: str) -> Optional[ChatHistoryAgentThread]:
+        row = self._spill.execute(
+            "SELECT history FROM spilled_threads WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._delete_spill(thread_id)
+        try:
+            history = ChatHistory.restore_chat_history(row[0])
+        except Exception:
+            self.metrics["spill_errors"] += 1
+            return None
+        self.metrics["rehydrated"] += 1
+        return ChatHistoryAgentThread(chat_history=history, thread_id=thread_id)
+
+    # ---- eviction ----
+
+    def _spill_thread(self, thread_id: str, thread: ChatHistoryAgentThread) -> None:
+        if self._io is None or thread._chat_history is None or not thread._chat_history.messages:
+            return
+        self._io.submit(self._write_spill, thread_id, thread)
+
+    def _evict(self, thread_id: str, reason: str) -> None:
+        entry = self._threads.pop(thread_id)
+        self._bytes -= entry["bytes"]
+        self.metrics[f"evicted_{reason}"] += 1
+        self._spill_thread(thread_id, entry["thread"])
+
+    def _enforce(self, now: float) -> None:
+        # idle TTL: the LRU order means expired threads are at the front
+        while self._threads:
+            thread_id, entry = next(iter(self._threads.items()))
+            if now - entry["last_used"] <= self.idle_ttl_seconds:
+                break
+            self._evict(thread_id, "ttl")
+        while len(self._threads) > self.max_threads:
+            self._evict(next(iter(self._threads)), "capacity")
+        while self._bytes > self.max_bytes and len(self._threads) > 1:
+            self._evict(next(iter(self._threads)), "memory")
+
+    # ---- public API ----
+
+    async def get(self, thread_id: str) -> ChatHistoryAgentThread:
+        now = time.time()
+        with self._lock:
+            self._enforce(now)   # TTL sweep before the lookup so an expired thread is spilled, then rehydrated
+            entry = self._threads.get(thread_id)
+            if entry is not None:
+                self.metrics["hits"] += 1
+                self._threads.move_to_end(thread_id)
+                entry["last_used"] = now
+                return entry["thread"]
+
+        thread = None
+        if self._io is not None:
+            thread = await asyncio.get_running_loop().run_in_executor(self._io, self._rehydrate, thread_id)
+
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is not None:
+                # admitted by a concurrent request while the spill file was read
+                self._threads.move_to_end(thread_id)
+                entry["last_used"] = now
+                return entry["thread"]
+            if thread is None:
+                thread = ChatHistoryAgentThread(thread_id=thread_id)
+                self.metrics["created"] += 1
+            size = estimate_thread_bytes(thread)
+            self._threads[thread_id] = {"thread": thread, "bytes": size, "last_used": now}
+            self._bytes += size
+            self._enforce(now)
+            return thread
+
+    def release(self, thread: ChatHistoryAgentThread) -> None:
+        """Re-measure `thread` after a turn (re-admitting it if it was evicted meanwhile)."""
+        now = time.time()
+        with self._lock:
+            entry = self._threads.get(thread.id)
+            if entry is None or entry["thread"] is not thread:
+                if entry is not None:
+                    self._bytes -= entry["bytes"]
+                entry = {"thread": thread, "bytes": 0}
+                self._threads[thread.id] = entry
+                if self._io is not None:
+                    # the in-flight thread is newer than anything spilled for it
+                    self._io.submit(self._delete_spill, thread.id)
+            size = estimate_thread_bytes(thread)
+            self._bytes += size - entry["bytes"]
+            entry["bytes"] = size
+            entry["last_used"] = now
+            self._threads.move_to_end(thread.id)
+            self._enforce(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "live_threads": len(self._threads),
+                "live_bytes": self._bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "spilled_threads": self._spilled_threads,   # as of the last spill-file write
+                **self.metrics,
+            }
+
+    def close(self) -> None:
+        """Spill every live thread (when spilling is enabled) and close the spill file."""
+        with self._lock:
+            for thread_id in list(self._threads):
+                entry = self._threads.pop(thread_id)
+                self._spill_thread(thread_id, entry["thread"])
+            self._bytes = 0
+        if self._io is not None:
+            self._io.shutdown(wait=True)   # finish every queued spill before closing the file
+            self._io = None
+            self._spill.close()
+            self._spill = None
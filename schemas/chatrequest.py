@@ -9,5 +9,13 @@ class ChatRequest(BaseModel):
     last_result_summary: Optional[str] = ""
     db_dialect: Optional[str] = "sqlite"
     max_rows: Optional[int] = 1000
+    query_timeout_ms: Optional[int] = 10000
     max_eval_retries: Optional[int] = 3
     max_debug_retries: Optional[int] = 3
+    result_format: Optional[str] = "tuples"   # rows | tuples | columnar | arrow
+    mode: Optional[str] = "orchestrator"      # orchestrator (LLM-driven) | pipeline (code-driven, NL2SQL questions only)
+    semantic_check: Optional[str] = "auto"    # pipeline only: auto | always | never (LLM EvaluationAgent)
+    use_semantic_cache: Optional[bool] = True # pipeline only: reuse SQL of a near-identical earlier question
+    num_candidates: Optional[int] = 1         # pipeline only: concurrent Builder candidates, first valid one wins
+    history_keep_turns: Optional[int] = 3     # turns kept verbatim; older ones become last_sql/last_result_summary
+    history_token_budget: Optional[int] = 4000  # estimated token budget for the conversation history
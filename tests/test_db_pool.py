@@ -0,0 +1,50 @@
+# test_db_pool.py
+# The async checkout waits off the event loop and never leaks a connection on cancellation.
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from Tools.db_pool import SQLiteConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = tmp_path / "pool.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.commit()
+    conn.close()
+    pool = SQLiteConnectionPool(str(path), size=1, timeout=5)
+    yield pool
+    pool.close()
+
+
+def test_connection_async_returns_connection(pool):
+    async def run():
+        async with pool.connection_async() as conn:
+            return conn.execute("SELECT count(*) FROM t").fetchone()[0]
+
+    assert asyncio.run(run()) == 0
+    assert pool._idle.qsize() == 1
+
+
+def test_cancelled_waiter_does_not_leak(pool):
+    async def run():
+        held = pool._acquire()                       # exhaust the pool
+        waiter = asyncio.ensure_future(pool.connection_async().__aenter__())
+        await asyncio.sleep(0.05)
+        ticks = 0
+        for _ in range(5):                           # the loop keeps running while the waiter blocks
+            await asyncio.sleep(0)
+            ticks += 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        pool._release(held)                          # the worker now gets it and must hand it back
+        await asyncio.sleep(0.2)
+        return ticks
+
+    assert asyncio.run(run()) == 5
+    assert pool._idle.qsize() == 1
@@ -0,0 +1,50 @@
+# test_history.py
+# Over budget, older verbatim turns are folded into the summary before any summary is dropped.
+
+import json
+
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+
+from agents.history import compact_history
+
+
+def _history(turns: int, reply_chars: int) -> ChatHistory:
+    history = ChatHistory()
+    for i in range(turns):
+        history.add_message(ChatMessageContent(role=AuthorRole.USER, content=f"question {i}"))
+        history.add_message(ChatMessageContent(role=AuthorRole.ASSISTANT, content=json.dumps({
+            "final_response": "x" * reply_chars, "last_sql": f"SELECT {i}", "last_result_summary": f"result {i}",
+        })))
+    return history
+
+
+def _covered(history: ChatHistory):
+    verbatim, summarized = [], []
+    for m in history.messages:
+        if m.role == AuthorRole.USER:
+            verbatim.append(m.content)
+        elif m.content.startswith("Summary of earlier turns"):
+            summarized += [s["question"] for s in json.loads(m.content.split(": ", 1)[1])]
+    return verbatim, summarized
+
+
+def test_dropped_verbatim_turns_stay_summarized():
+    history = _history(5, reply_chars=3000)
+    stats = compact_history(history, keep_turns=3, token_budget=2000)
+
+    verbatim, summarized = _covered(history)
+    assert stats["tokens_after"] <= 2000
+    assert stats["dropped_turns"] == 0
+    assert summarized == ["question 0", "question 1", "question 2"]
+    assert verbatim == ["question 3", "question 4"]
+
+
+def test_oldest_summaries_are_dropped_last():
+    history = _history(40, reply_chars=10)
+    stats = compact_history(history, keep_turns=1, token_budget=300)
+
+    verbatim, summarized = _covered(history)
+    assert stats["tokens_after"] <= 300
+    assert verbatim == ["question 39"]
+    assert summarized and summarized[-1] == "question 38"
+    assert stats["dropped_turns"] == 39 - len(summarized)
@@ -0,0 +1,46 @@
+# test_index_advisor.py
+# Queries are only queued when executed; plans are taken when advice is requested.
+
+import sqlite3
+
+import pytest
+
+from Tools.index_advisor import IndexAdvisor
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "advisor.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE people (id INTEGER, city TEXT, name TEXT, bio TEXT, a, b, c, d)")
+    conn.executemany("INSERT INTO people (id, city, name) VALUES (?, ?, ?)",
+                     [(i, f"city{i % 50}", f"n{i}") for i in range(2000)])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_record_only_queues(db_path):
+    advisor = IndexAdvisor(db_path, min_occurrences=2)
+    advisor.record("SELECT name FROM people WHERE city = ? LIMIT 10", ["city1"])
+    advisor.record("SELECT name FROM people WHERE city = ? LIMIT 10", ["city1"])
+    assert advisor.pending == 1
+    assert advisor.queries_recorded == 2
+
+
+def test_covering_and_plain_proposals(db_path):
+    advisor = IndexAdvisor(db_path, min_occurrences=2)
+    for city in ("city1", "city2"):
+        advisor.record("SELECT id, name FROM people WHERE city = ? LIMIT 10", [city])
+        advisor.record("SELECT * FROM people WHERE name = ? LIMIT 10", [city])
+    proposals = {tuple(p["columns"]): p for p in advisor.advise()}
+    assert advisor.pending == 0
+
+    covering = proposals[("city",)]
+    assert covering["covering"] and covering["include_columns"] == ["id", "name"]
+    assert covering["sql"].endswith('("city", "id", "name")')
+    assert not proposals[("name",)]["covering"]   # SELECT * reads too many columns to cover
+
+    report = advisor.apply_advice([covering])
+    assert report[0]["created"] and report[0]["before_ms"] is not None
+    assert ("city",) not in {tuple(p["columns"]) for p in advisor.advise()}
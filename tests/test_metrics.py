@@ -0,0 +1,38 @@
+# test_metrics.py
+# Kernel function invocations are recorded with the status they actually ended with.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from Tools import metrics
+
+
+def _count(function: str, status: str) -> str:
+    prefix = f'nl2sql_kernel_function_duration_seconds_count{{plugin="TestPlugin",function="{function}",status="{status}"}}'
+    return next((line.split()[-1] for line in metrics.FUNCTION_LATENCY.render() if line.startswith(prefix)), "0")
+
+
+@pytest.mark.parametrize("function, raised, status", [
+    ("returns", None, "ok"),
+    ("fails", ValueError, "error"),
+    ("is_cancelled", asyncio.CancelledError, "cancelled"),
+])
+def test_function_invocation_status(function, raised, status):
+    context = SimpleNamespace(function=SimpleNamespace(plugin_name="TestPlugin", name=function))
+
+    async def next_(ctx):
+        if raised:
+            raise raised()
+
+    async def invoke():
+        await metrics.function_invocation_filter(context, next_)
+
+    if raised:
+        with pytest.raises(raised):
+            asyncio.run(invoke())
+    else:
+        asyncio.run(invoke())
+    assert _count(function, status) == "1"
+    assert all(_count(function, other) == "0" for other in {"ok", "error", "cancelled"} - {status})
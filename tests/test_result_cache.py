@@ -0,0 +1,38 @@
+# test_result_cache.py
+# Cache keys must keep literals verbatim, and cached results must not be shared by reference.
+
+import pytest
+
+from Tools.result_cache import ResultCache, canonicalize_sql
+
+
+@pytest.mark.parametrize("a, b", [
+    ("SELECT * FROM t WHERE name = 'a , b'", "SELECT * FROM t WHERE name = 'a,b'"),
+    ("SELECT * FROM t WHERE name = 'a  b'", "SELECT * FROM t WHERE name = 'a b'"),
+    ("SELECT * FROM t WHERE name = 'Ann'", "SELECT * FROM t WHERE name = 'ann'"),
+    ('SELECT "First  Name" FROM t', 'SELECT "First Name" FROM t'),
+    ("SELECT * FROM t WHERE note = 'x;'", "SELECT * FROM t WHERE note = 'x'"),
+])
+def test_literal_differences_are_different_keys(a, b):
+    assert ResultCache.make_key(a) != ResultCache.make_key(b)
+
+
+def test_formatting_outside_literals_is_ignored():
+    a = "SELECT name , COUNT(*)\n  FROM t -- all rows\n WHERE city = 'New  York' ;"
+    b = "select name,count( * ) from t where city='New  York'"
+    assert canonicalize_sql(a) == canonicalize_sql(b) == "select name,count(*)from t where city='New  York'"
+
+
+def test_results_are_copied_in_and_out():
+    cache = ResultCache()
+    key = ResultCache.make_key("SELECT a FROM t")
+    result = {"success": True, "rows": [[1], [2]], "columns": ["a"]}
+    cache.put(key, 1, result)
+
+    result["rows"].append([3])
+    hit = cache.get(key, 1)
+    assert hit["rows"] == [[1], [2]]
+
+    hit["rows"][0][0] = 99
+    hit["columns"].clear()
+    assert cache.get(key, 1) == {"success": True, "rows": [[1], [2]], "columns": ["a"]}
@@ -0,0 +1,28 @@
+# test_semantic_cache.py
+# Questions that differ only in intent / aggregate words must not share cached SQL.
+
+import pytest
+
+from Tools.semantic_cache import SemanticCache
+
+COUNT_SQL = {"sql": "SELECT DepartmentType, COUNT(*) FROM employee_data GROUP BY DepartmentType", "params": []}
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("How many employees per department?", "Show all employees in each department"),
+    ("How many employees per department?", "Which employees are in each department?"),
+    ("Show all employees in each department", "How many employees per department?"),
+    ("What is the average engagement score?", "What is the highest engagement score?"),
+    ("What is the total training cost?", "What is the average training cost?"),
+])
+def test_intent_changes_are_misses(stored, asked):
+    cache = SemanticCache()
+    cache.store(stored, "schema", COUNT_SQL)
+    assert cache.lookup(asked, "schema") is None
+
+
+def test_rewording_is_a_hit():
+    cache = SemanticCache()
+    cache.store("What is the headcount per department?", "schema", COUNT_SQL)
+    hit = cache.lookup("headcount by department", "schema")
+    assert hit is not None and hit["sql"] == COUNT_SQL["sql"]
@@ -0,0 +1,31 @@
+# test_sql_validator.py
+# LIMIT may be a literal or a ? placeholder; either way it is checked against max_rows.
+
+import sqlite3
+
+import pytest
+
+from Tools.sql_validator import validate_sql
+
+COLUMNS = [{"table_name": "t", "column_name": "a"}, {"table_name": "t", "column_name": "b"}]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("sql, params, issues", [
+    ("SELECT a FROM t LIMIT ?", [5], []),
+    ("SELECT a FROM t WHERE b = ? LIMIT ?", ["x", 5], []),
+    ("SELECT a FROM t WHERE b = '?' LIMIT ?", [5], []),
+    ("SELECT a FROM t LIMIT ?", [5000], ["LIMIT 5000 exceeds max_rows (1000)."]),
+    ("SELECT a FROM t LIMIT ?", ["all"], ["LIMIT ? must be bound to an integer in params."]),
+    ("SELECT a FROM t LIMIT 5000", [], ["LIMIT 5000 exceeds max_rows (1000)."]),
+    ("SELECT a FROM t", [], ["LIMIT clause is missing."]),
+])
+def test_limit_checks(conn, sql, params, issues):
+    assert validate_sql(conn, sql, COLUMNS, params=params, max_rows=1000)["issues"] == issues
@@ -0,0 +1,50 @@
+# test_table_stats.py
+# A table whose content changes without changing its row count must still be re-scanned.
+
+import sqlite3
+
+import pytest
+
+from Tools.table_stats import TableStatistics
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE survey (score INTEGER)")
+    conn.executemany("INSERT INTO survey VALUES (?)", [(i % 5,) for i in range(200)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_replaced_table_with_same_row_count_is_rescanned(conn):
+    stats = TableStatistics()
+    stats.refresh(conn, ["survey"])
+    assert stats.get()["survey"]["columns"]["score"]["max"] == 4
+
+    # the importer's replace: load a staging table, then DROP + RENAME it in
+    conn.execute("CREATE TABLE survey__staging (score INTEGER)")
+    conn.executemany("INSERT INTO survey__staging VALUES (?)", [(i % 5 + 100,) for i in range(200)])
+    conn.execute("DROP TABLE survey")
+    conn.execute("ALTER TABLE survey__staging RENAME TO survey")
+    conn.commit()
+
+    assert stats.refresh(conn, ["survey"]) == ["survey"]
+    assert stats.get()["survey"]["columns"]["score"]["max"] == 104
+
+
+def test_new_manifest_hash_is_rescanned(conn):
+    conn.execute("CREATE TABLE import_manifest (path TEXT PRIMARY KEY, table_name TEXT, content_hash TEXT)")
+    conn.execute("INSERT INTO import_manifest VALUES ('survey.csv', 'survey', 'h1')")
+    conn.commit()
+    stats = TableStatistics()
+    stats.refresh(conn, ["survey"])
+    assert stats.refresh(conn, ["survey"]) == []
+
+    conn.execute("UPDATE survey SET score = score + 100")
+    conn.execute("UPDATE import_manifest SET content_hash = 'h2'")
+    conn.commit()
+
+    assert stats.refresh(conn, ["survey"]) == ["survey"]
+    assert stats.get()["survey"]["columns"]["score"]["max"] == 104